@@ -22,6 +22,9 @@ from lettuce.streaming import *
 from lettuce.boundary import *
 from lettuce.reporters import *
 from lettuce.simulation import *
+from lettuce.decomposition import *
+from lettuce.sparse import *
+from lettuce.tiling import *
 from lettuce.force import *
 from lettuce.observables import *
 from lettuce.datautils import *
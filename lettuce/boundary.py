@@ -19,19 +19,67 @@ The no-collision mask has the same dimensions as the grid (x, y, (z)).
 import paddle
 import numpy as np
 from lettuce import (LettuceException)
-from lettuce.utils import pdnorm,pdzeros
+from lettuce.utils import pdzeros
 
-__all__ = ["BounceBackBoundary", "AntiBounceBackOutlet", "EquilibriumBoundaryPU", "EquilibriumOutletP"]
+__all__ = [
+    "BounceBackBoundary", "HalfwayBounceBackBoundary", "AntiBounceBackOutlet", "EquilibriumBoundaryPU",
+    "EquilibriumOutletP"
+]
+
+
+def _bounce_back_links(mask, lattice, halfway=False):
+    """Flat indices (into f.flatten()) of the populations on the links between fluid and solid nodes.
+
+    Returns the populations that streamed from a fluid node into a solid node and the slots of their
+    opposites, either at the solid node (fullway) or at the fluid node (halfway). Neighbors wrap periodically.
+    """
+    num_nodes = mask.size
+    nodes = np.arange(num_nodes, dtype=np.int64).reshape(mask.shape)
+    dims = tuple(range(mask.ndim))
+    source, target = [], []
+    for i, e in enumerate(lattice.stencil.e):
+        # node x - e_i, from which population i streams into node x
+        neighbor = np.roll(nodes, shift=tuple(e), axis=dims)
+        link = mask & ~mask.reshape(-1)[neighbor]
+        opposite = lattice.stencil.opposite[i]
+        source.append(i * num_nodes + nodes[link])
+        target.append(opposite * num_nodes + (neighbor[link] if halfway else nodes[link]))
+    return paddle.to_tensor(np.concatenate(source)), paddle.to_tensor(np.concatenate(target))
+
+
+def _bounce_links(f, links):
+    """Copy the source populations of the links to their targets, in place on the flat view of f."""
+    source, target = links
+    f, f_flat = _flat_view(f)
+    f_flat.scatter_(target, paddle.gather(f_flat, source))
+    return f
+
+
+def _flat_view(f):
+    """f and a flat view of it for in-place writes. Views that are not contiguous (e.g. a slab of a larger tensor)
+    would be flattened into a copy, so they are made contiguous first."""
+    if not f.is_contiguous():
+        f = f.contiguous()
+    return f, f.reshape([-1])
 
 
 class BounceBackBoundary:
-    """Fullway Bounce-Back Boundary"""
+    """Fullway Bounce-Back Boundary
 
-    def __init__(self, mask, lattice):
+    With `sparse=True`, only the populations on the links between fluid and solid nodes are bounced,
+    by one gather and one scatter of precomputed indices, so that the cost scales with the size of the boundary
+    instead of the domain. Populations that stream from solid to solid nodes are then left untouched,
+    which does not affect the fluid.
+    """
+
+    def __init__(self, mask, lattice, sparse=False):
         self.mask = lattice.convert_to_tensor(mask)
         self.lattice = lattice
+        self.links = _bounce_back_links(lattice.convert_to_numpy(self.mask), lattice) if sparse else None
 
     def __call__(self, f):
+        if self.links is not None:
+            return _bounce_links(f, self.links)
         f = paddle.where(self.mask, f[self.lattice.stencil.opposite], f)
         return f
 
@@ -40,27 +88,97 @@ class BounceBackBoundary:
         return self.mask
 
 
+class HalfwayBounceBackBoundary:
+    """Halfway Bounce-Back Boundary
+
+    The wall lies halfway between the fluid and the solid nodes of the mask. Populations that streamed
+    from a fluid node into a solid node are sent back to the fluid node in the opposite direction within the
+    same step. Uses the same precomputed link indices as the sparse :class:`BounceBackBoundary`.
+    """
+
+    def __init__(self, mask, lattice):
+        self.mask = lattice.convert_to_tensor(mask)
+        self.lattice = lattice
+        self.links = _bounce_back_links(lattice.convert_to_numpy(self.mask), lattice, halfway=True)
+
+    def __call__(self, f):
+        return _bounce_links(f, self.links)
+
+    def make_no_collision_mask(self, f_shape):
+        assert self.mask.shape == f_shape[1:]
+        return self.mask
+
+
 class EquilibriumBoundaryPU:
     """Sets distributions on this boundary to equilibrium with predefined velocity and pressure.
     Note that this behavior is generally not compatible with the Navier-Stokes equations.
     This boundary condition should only be used if no better options are available.
+
+    The velocity and pressure can be constants, fields on the grid, or callables ``value(t, x)`` of the time `t`
+    and the coordinates `x` of the boundary nodes (a list of 1D arrays, or None if no `grid` is given),
+    all in physical units. A callable returns the value at every boundary node or one value for all of them.
+    The equilibrium is stored on the boundary nodes only and computed once; callables are re-evaluated every step.
+
+    The time passed to callables comes from the boundary's own counter `i` of calls, which the simulation starts at 0
+    (it applies a fresh copy of the flow's boundaries). When a boundary object is reused, or a simulation is
+    resumed at a later step, set `i` to the number of steps already taken.
     """
 
-    def __init__(self, mask, lattice, units, velocity, pressure=0):
+    def __init__(self, mask, lattice, units, velocity, pressure=0, grid=None):
         self.mask = lattice.convert_to_tensor(mask)
         self.lattice = lattice
         self.units = units
-        self.velocity = lattice.convert_to_tensor(velocity)
-        self.pressure = lattice.convert_to_tensor(pressure)
+        self.velocity = velocity if callable(velocity) else lattice.convert_to_tensor(velocity)
+        self.pressure = pressure if callable(pressure) else lattice.convert_to_tensor(pressure)
+        self.grid = None if grid is None else np.stack(grid)
+        self.i = 0
+        self._mask = None
+        self._nodes = None
+        self._index = None
+        self._x = None
+        self._feq = None
 
     def __call__(self, f):
-        rho = self.units.convert_pressure_pu_to_density_lu(self.pressure)
-        u = self.units.convert_velocity_to_lu(self.velocity)
-        feq = self.lattice.equilibrium(rho, u)
-        feq = self.lattice.einsum("q,q->q", [feq, paddle.ones_like(f)])
-        f = paddle.where(self.mask, feq, f)
+        self.i += 1
+        # (re)build when the mask has been replaced, e.g. by a domain decomposition
+        if self._mask is not self.mask:
+            self._build(f.shape)
+        feq = self._feq
+        if feq is None:
+            feq = self._equilibrium(self.units.convert_time_to_pu(self.i))
+        f, f_flat = _flat_view(f)
+        f_flat.scatter_(self._index, feq.flatten())
         return f
 
+    def _build(self, f_shape):
+        mask = self.lattice.convert_to_numpy(self.mask)
+        nodes = np.flatnonzero(mask)
+        self._nodes = paddle.to_tensor(nodes)
+        self._index = paddle.to_tensor((np.arange(f_shape[0])[:, None] * mask.size + nodes).reshape(-1))
+        self._x = None if self.grid is None else [xd.reshape(-1)[nodes] for xd in self.grid]
+        self._mask = self.mask
+        is_constant = not (callable(self.velocity) or callable(self.pressure))
+        self._feq = self._equilibrium(None) if is_constant else None
+
+    def _equilibrium(self, t):
+        """Equilibrium on the boundary nodes with shape (Q, number of boundary nodes)."""
+        velocity = self.velocity(t, self._x) if callable(self.velocity) else self.velocity
+        pressure = self.pressure(t, self._x) if callable(self.pressure) else self.pressure
+        u = self.units.convert_velocity_to_lu(self._at_nodes(velocity, self.lattice.D))
+        rho = self.units.convert_pressure_pu_to_density_lu(self._at_nodes(pressure, 1))
+        return self.lattice.equilibrium(rho, u)
+
+    def _at_nodes(self, value, num_components):
+        value = self.lattice.convert_to_tensor(value)
+        num_nodes = self._nodes.shape[0]
+        size = int(np.prod(value.shape))
+        if size == num_components * num_nodes:
+            return value.reshape([num_components, num_nodes])
+        if size > num_components:
+            # field on the full grid
+            return paddle.index_select(value.reshape([num_components, -1]), self._nodes, axis=1)
+        return value.reshape([num_components, 1]).expand([num_components, num_nodes])
+
 class AntiBounceBackOutlet:
     """Allows distributions to leave domain unobstructed through this boundary.
         Based on equations from page 195 of "The lattice Boltzmann method" (2016 by Krüger et al.)
@@ -103,43 +221,32 @@ class AntiBounceBackOutlet:
             if i == -1:
                 self.index.append(0)
                 self.neighbor.append(1)
-        # construct indices for einsum and get w in proper shape for the calculation in each dimension
-        if len(direction) == 3:
-            self.dims = 'dc, cxy -> dxy'
-            self.w = self.lattice.w[self.velocities].reshape((1, -1)).unsqueeze(1)
-        if len(direction) == 2:
-            self.dims = 'dc, cx -> dx'
-            self.w = self.lattice.w[self.velocities].reshape((1, -1)).t()
-        if len(direction) == 1:
-            self.dims = 'dc, c -> dc'
-            self.w = self.lattice.w[self.velocities]
-
+        self.index = tuple(self.index)
+        self.neighbor = tuple(self.neighbor)
+        # velocity-independent factors of the bounced populations, broadcastable to the outlet plane
+        self.opposite_velocities = np.array(self.lattice.stencil.opposite)[self.velocities]
+        self.e_velocities = self.lattice.e[self.velocities]
+        self.w = self.lattice.w[self.velocities].reshape([len(self.velocities)] + [1] * (len(direction) - 1))
 
     def __call__(self, f):
-
-        u = self.lattice.u(f)
-        new_f = f.cpu().numpy()
-        u = u.cpu().numpy()
-        u_w = u[[slice(None)] + self.index] + 0.5 * (u[[slice(None)] + self.index] - u[[slice(None)] + self.neighbor])
-        u_w = paddle.to_tensor(u_w)
-        if len(self.w.shape)==3:
-          new_f[[np.array(self.lattice.stencil.opposite)[self.velocities]] + self.index] = (
-                  - new_f[[self.velocities] + self.index] + self.w.cpu().numpy().transpose(2,0,1) * self.lattice.rho(f).cpu().numpy()[[slice(None)] + self.index] *
-                  (2 + paddle.einsum(self.dims, self.lattice.e[self.velocities], u_w) ** 2 / self.lattice.cs ** 4
-                  - (pdnorm(u_w, dim=0) / self.lattice.cs) ** 2).cpu().numpy()
-          )
-        else:
-          new_f[[np.array(self.lattice.stencil.opposite)[self.velocities]] + self.index] = (
-                  - new_f[[self.velocities] + self.index] + self.w.cpu().numpy() * self.lattice.rho(f).cpu().numpy()[[slice(None)] + self.index] *
-                  (2 + paddle.einsum(self.dims, self.lattice.e[self.velocities], u_w) ** 2 / self.lattice.cs ** 4
-                  - (pdnorm(u_w, dim=0) / self.lattice.cs) ** 2).cpu().numpy()
-          )
-        return paddle.to_tensor(new_f)
-
+        # only the outlet plane and its neighbor are needed
+        f_here = f[(slice(None),) + self.index]
+        f_neighbor = f[(slice(None),) + self.neighbor]
+        rho = self.lattice.rho(f_here)
+        u = self.lattice.u(f_here, rho=rho)
+        u_w = 1.5 * u - 0.5 * self.lattice.u(f_neighbor)
+        eu = self.lattice.einsum("qd,d->q", [self.e_velocities, u_w])
+        uu = self.lattice.einsum("d,d->", [u_w, u_w])
+        f_bounced = -f_here[self.velocities] + self.w * rho * (
+                2 + eu ** 2 / self.lattice.cs ** 4 - uu / self.lattice.cs ** 2
+        )
+        for k, q in enumerate(self.opposite_velocities):
+            f[(int(q),) + self.index] = f_bounced[k]
+        return f
 
     def make_no_stream_mask(self, f_shape):
         no_stream_mask = pdzeros(size=f_shape, dtype=paddle.bool, device=self.lattice.device)
-        no_stream_mask[[np.array(self.lattice.stencil.opposite)[self.velocities]] + self.index] = 1
+        no_stream_mask[(self.opposite_velocities,) + self.index] = 1
         return no_stream_mask
 
     # not 100% sure about this. But collisions seem to stabilize the boundary.
@@ -158,18 +265,16 @@ class EquilibriumOutletP(AntiBounceBackOutlet):
         self.rho0 = rho0
 
     def __call__(self, f):
-        here = [slice(None)] + self.index
-        other = [slice(None)] + self.neighbor
-        rho = self.lattice.rho(f)
-        u = self.lattice.u(f)
-        rho_w = self.rho0 * paddle.ones_like(rho[here])
-        u_w = u[other]
+        # only the velocity next to the outlet plane is needed
+        here = (slice(None),) + self.index
+        u_w = self.lattice.u(f[(slice(None),) + self.neighbor])
+        rho_w = self.rho0 * paddle.ones_like(u_w[:1])
         f[here] = self.lattice.equilibrium(rho_w[..., None], u_w[..., None])[..., 0]
         return f
 
     def make_no_stream_mask(self, f_shape):
         no_stream_mask = pdzeros(size=f_shape, dtype=paddle.bool, device=self.lattice.device)
-        no_stream_mask[[np.setdiff1d(np.arange(self.lattice.Q), self.velocities)] + self.index] = 1
+        no_stream_mask[(np.setdiff1d(np.arange(self.lattice.Q), self.velocities),) + self.index] = 1
         return no_stream_mask
 
     def make_no_collision_mask(self, f_shape):
@@ -11,6 +11,7 @@ To get help for terminal commands, open a console and type:
 import sys
 import cProfile
 import pstats
+from timeit import default_timer as timer
 
 import click
 import paddle
@@ -19,10 +20,10 @@ import numpy as np
 from lettuce import BGKCollision, StandardStreaming, Lattice, D2Q9
 from lettuce import __version__ as lettuce_version
 
-from lettuce import TaylorGreenVortex2D, Simulation, ErrorReporter, VTKReporter
+from lettuce import TaylorGreenVortex2D, Simulation, TiledSimulation, ErrorReporter, VTKReporter
 from lettuce.flows import flow_by_name
 from lettuce.force import Guo
-from lettuce.utils import cuda_available
+from lettuce.utils import cuda_available, pdsum, pdmean, pdmax, pdnorm, pdmaxnorm
 
 
 @click.group()
@@ -97,6 +98,105 @@ def benchmark(ctx, steps, resolution, profile_out, flow, vtk_out):
     return 0
 
 
+@main.command()
+@click.option("-s", "--steps", type=int, default=100, help="Number of time steps per measurement.")
+@click.option("-r", "--resolution", type=int, default=256, help="Grid Resolution")
+@click.option("-n", "--steps-per-call", type=int, default=10, help="Number of steps captured in one compiled graph.")
+@click.option("-f", "--flow", "flows", type=click.Choice(flow_by_name.keys()), multiple=True,
+              help="Flows to benchmark (default: all flows).")
+@click.pass_context
+def compiled(ctx, steps, resolution, steps_per_call, flows):
+    """Compare the performance of eager and compiled simulation steps in MLUPS.
+    """
+    device, dtype = ctx.obj['device'], ctx.obj['dtype']
+    print(("{:>15} " * 4).format("flow", "eager", "compiled", "gain"))
+    for name in flows or flow_by_name.keys():
+        flow_class, stencil = flow_by_name[name]
+        lattice = Lattice(stencil, device, dtype)
+        flow = flow_class(resolution=resolution, reynolds_number=1, mach_number=0.05, lattice=lattice)
+        mlups = []
+        for compile_steps in [False, True]:
+            force = Guo(
+                lattice,
+                tau=flow.units.relaxation_parameter_lu,
+                acceleration=flow.units.convert_acceleration_to_lu(flow.acceleration)
+            ) if hasattr(flow, "acceleration") else None
+            collision = BGKCollision(lattice, tau=flow.units.relaxation_parameter_lu, force=force)
+            streaming = StandardStreaming(lattice)
+            simulation = Simulation(flow=flow, lattice=lattice, collision=collision, streaming=streaming)
+            if compile_steps:
+                simulation.compile(steps_per_call=steps_per_call)
+            # warm-up (includes tracing the graph in compiled mode)
+            simulation.step(num_steps=steps_per_call)
+            mlups.append(float(simulation.step(num_steps=steps)))
+        print("{:>15} {:15.2f} {:15.2f} {:15.2f}".format(name, mlups[0], mlups[1], mlups[1] / mlups[0]))
+    return 0
+
+
+@main.command()
+@click.option("-s", "--steps", type=int, default=20, help="Number of time steps per measurement.")
+@click.option("-r", "--resolution", type=int, default=128, help="Grid Resolution")
+@click.option("-t", "--tile", type=int, default=16, help="Tile size along the first axis (default=16).")
+@click.option("-n", "--threads", type=int, default=None, help="Number of threads (default: number of cores).")
+@click.option("-f", "--flow", type=click.Choice(flow_by_name.keys()), default="taylor3D")
+@click.pass_context
+def tiled(ctx, steps, resolution, tile, threads, flow):
+    """Compare the performance of the standard and the tiled simulation step in MLUPS.
+    """
+    device, dtype = ctx.obj['device'], ctx.obj['dtype']
+    flow_class, stencil = flow_by_name[flow]
+    lattice = Lattice(stencil, device, dtype)
+    flow = flow_class(resolution=resolution, reynolds_number=1, mach_number=0.05, lattice=lattice)
+    collision = BGKCollision(lattice, tau=flow.units.relaxation_parameter_lu)
+    tile_shape = (tile,) + (None,) * (lattice.D - 1)
+    variants = [(Simulation, {}), (TiledSimulation, dict(tile_shape=tile_shape, num_threads=threads))]
+    mlups = []
+    for simulation_class, kwargs in variants:
+        simulation = simulation_class(flow=flow, lattice=lattice, collision=collision,
+                                      streaming=StandardStreaming(lattice), **kwargs)
+        simulation.step(num_steps=1)
+        mlups.append(float(simulation.step(num_steps=steps)))
+    print(("{:>15} " * 3).format("standard", "tiled", "gain"))
+    print("{:15.2f} {:15.2f} {:15.2f}".format(mlups[0], mlups[1], mlups[1] / mlups[0]))
+    return 0
+
+
+@main.command()
+@click.option("-r", "--resolution", type=int, default=256, help="Grid Resolution")
+@click.option("-n", "--repeat", type=int, default=10, help="Number of calls per helper.")
+@click.pass_context
+def reductions(ctx, resolution, repeat):
+    """Print the per-call cost of the reduction helpers in lettuce.utils on a 3D velocity field.
+    """
+    device, dtype = ctx.obj['device'], ctx.obj['dtype']
+
+    def synchronize():
+        if device.startswith("cuda"):
+            paddle.device.cuda.synchronize()
+
+    u = paddle.rand([3] + [resolution] * 3).astype(dtype)
+    helpers = [
+        ("pdsum", lambda: pdsum(u)),
+        ("pdmean", lambda: pdmean(u)),
+        ("pdmax", lambda: pdmax(u)),
+        ("pdnorm", lambda: pdnorm(u)),
+        ("pdnorm(dim=0)", lambda: pdnorm(u, dim=0)),
+        ("pdmaxnorm", lambda: pdmaxnorm(u, dim=0)),
+    ]
+    gigabytes = int(np.prod(u.shape)) * u.element_size() / 1e9
+    print(("{:>15} " * 3).format("helper", "ms per call", "GB/s"))
+    for name, helper in helpers:
+        helper()
+        synchronize()
+        start = timer()
+        for _ in range(repeat):
+            helper()
+        synchronize()
+        seconds = (timer() - start) / repeat
+        print("{:>15} {:15.3f} {:15.2f}".format(name, seconds * 1e3, gigabytes / seconds))
+    return 0
+
+
 @main.command()
 @click.option("--init_f_neq/--no-initfneq", default=False, help="Initialize fNeq via finite differences")
 @click.pass_context
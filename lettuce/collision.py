@@ -3,31 +3,46 @@
 Collision models
 """
 
+from copy import deepcopy
+import numpy as np
 import paddle
 
 from lettuce.equilibrium import QuadraticEquilibrium
-from lettuce.util import LettuceException
-from lettuce.utils import pdzeros
+from lettuce.util import LettuceException, ensemble_parameter, _check_node_local, _cut_fields
+from lettuce.utils import pdroll
 
 __all__ = [
     "BGKCollision", "KBCCollision2D", "KBCCollision3D", "MRTCollision", "RegularizedCollision",
-    "SmagorinskyCollision", "TRTCollision", "BGKInitialization"
+    "RecursiveRegularizedCollision", "SmagorinskyCollision", "TRTCollision", "BGKInitialization",
+    "ChunkedCollision", "LESCollision", "SmagorinskyModel", "WALEModel", "VremanModel"
 ]
 
 
 class BGKCollision:
+    """Single relaxation time collision.
+    For ensembles, `tau` can hold one relaxation time per member (see :class:`lettuce.EnsembleFlow`).
+    """
+
     def __init__(self, lattice, tau, force=None):
         self.force = force
         self.lattice = lattice
-        self.tau = tau
+        self.tau = ensemble_parameter(lattice, tau)
 
     def __call__(self, f):
-        rho = self.lattice.rho(f)
-        u_eq = 0 if self.force is None else self.force.u_eq(f)
-        u = self.lattice.u(f, rho=rho) + u_eq
-        feq = self.lattice.equilibrium(rho, u)
-        Si = 0 if self.force is None else self.force.source_term(u)
-        return f - 1.0 / self.tau * (f - feq) + Si
+        rho, j = self.lattice.moments(f)
+        u_eq = 0 if self.force is None else self.force.u_eq(f, rho)
+        u = j / rho + u_eq
+        # f + (feq - f) / tau, accumulated in the buffer of feq, so that no further grid-sized temporaries are allocated
+        # (the results are reassigned, since the in-place operations are out of place in a captured graph)
+        f_post = self.lattice.equilibrium(rho, u).subtract_(f)
+        if isinstance(self.tau, paddle.Tensor):
+            f_post = f_post.multiply_(1.0 / self.tau)
+        else:
+            f_post = f_post.scale_(1.0 / self.tau)
+        f_post = f_post.add_(f)
+        if self.force is not None:
+            f_post = f_post.add_(self.force.source_term(u))
+        return f_post
 
 
 class MRTCollision:
@@ -35,14 +50,40 @@ class MRTCollision:
 
     This is an MRT operator in the most general sense of the word.
     The transform does not have to be linear and can, e.g., be any moment or cumulant transform.
+
+    For linear transforms (with a `matrix` M and its `inverse`), the product M^-1 S with the diagonal matrix S
+    of relaxation rates is precomputed, so that the collision f - M^-1 S (m - meq(m)) with m = M f needs
+    two matrix products. If the transform declares that its equilibrium moments are those of the lattice
+    equilibrium (`lattice_equilibrium`), M^-1 S M is precomputed and applied to f - feq in one matrix product instead.
     """
 
     def __init__(self, lattice, transform, relaxation_parameters):
         self.lattice = lattice
         self.transform = transform
         self.relaxation_parameters = lattice.convert_to_tensor(relaxation_parameters)
+        # M^-1 S M with the lattice equilibrium, M^-1 S with the moment equilibrium of the transform
+        self.relaxation_matrix = None
+        self.relaxed_inverse = None
+        if self._is_linear():
+            matrix = lattice.convert_to_numpy(transform.matrix).astype(np.float64)
+            inverse = lattice.convert_to_numpy(transform.inverse).astype(np.float64)
+            rates = 1 / lattice.convert_to_numpy(self.relaxation_parameters).astype(np.float64)
+            if getattr(transform, "lattice_equilibrium", False):
+                self.relaxation_matrix = lattice.convert_to_tensor(inverse @ np.diag(rates) @ matrix)
+            else:
+                self.relaxed_inverse = lattice.convert_to_tensor(inverse @ np.diag(rates))
+
+    def _is_linear(self):
+        return all(isinstance(getattr(self.transform, name, None), paddle.Tensor) for name in ["matrix", "inverse"])
 
     def __call__(self, f):
+        if self.relaxed_inverse is not None:
+            m = self.transform.transform(f)
+            return f - self.lattice.mv(self.relaxed_inverse, m - self.transform.equilibrium(m))
+        if self.relaxation_matrix is not None:
+            rho, j = self.lattice.moments(f)
+            feq = self.lattice.equilibrium(rho, j / rho)
+            return f - self.lattice.mv(self.relaxation_matrix, f - feq)
         m = self.transform.transform(f)
         meq = self.transform.equilibrium(m)
         m = m - self.lattice.einsum("q,q->q", [1 / self.relaxation_parameters, m - meq])
@@ -52,57 +93,129 @@ class MRTCollision:
 
 class TRTCollision:
     """Two relaxation time collision model - standard implementation (cf. Krüger 2017)
-        """
 
-    def __init__(self, lattice, tau, tau_minus=1.0):
+    The non-equilibrium part f - feq is split into its symmetric and antisymmetric parts with respect to
+    opposite directions, which relax with `tau` and `tau_minus`. Since
+    f_neq^+ / tau_plus + f_neq^- / tau_minus = a f_neq + b f_neq[opposite], with a and b combinations of
+    the two rates, the collision needs one gather with the precomputed opposite permutation.
+
+    Instead of `tau_minus`, the magic parameter Lambda = (tau_plus - 1/2) (tau_minus - 1/2) can be given
+    (e.g. 1/4 for stable, 3/16 for wall-exact bounce-back in Poiseuille flow).
+    For ensembles, `tau` and `tau_minus` can hold one relaxation time per member.
+    """
+
+    def __init__(self, lattice, tau, tau_minus=1.0, magic=None):
         self.lattice = lattice
-        self.tau_plus = tau
-        self.tau_minus = tau_minus
+        self.tau_plus = ensemble_parameter(lattice, tau)
+        if magic is None:
+            self.tau_minus = ensemble_parameter(lattice, tau_minus)
+        else:
+            self.tau_minus = magic / (self.tau_plus - 0.5) + 0.5
+        self.opposite = paddle.to_tensor(np.asarray(lattice.stencil.opposite, dtype=np.int64))
+        self._a = 0.5 * (1.0 / self.tau_plus + 1.0 / self.tau_minus)
+        self._b = 0.5 * (1.0 / self.tau_plus - 1.0 / self.tau_minus)
+
+    @property
+    def magic(self):
+        """magic parameter Lambda = (tau_plus - 1/2) (tau_minus - 1/2)"""
+        return (self.tau_plus - 0.5) * (self.tau_minus - 0.5)
 
     def __call__(self, f):
-        rho = self.lattice.rho(f)
-        u = self.lattice.u(f, rho=rho)
-        feq = self.lattice.equilibrium(rho, u)
-        f_diff_neq = ((f + f[self.lattice.stencil.opposite]) - (feq + feq[self.lattice.stencil.opposite])) / (
-                2.0 * self.tau_plus)
-        f_diff_neq += ((f - f[self.lattice.stencil.opposite]) - (feq - feq[self.lattice.stencil.opposite])) / (
-                2.0 * self.tau_minus)
-        f = f - f_diff_neq
-        return f
+        rho, j = self.lattice.moments(f)
+        feq = self.lattice.equilibrium(rho, j / rho)
+        f_neq = f - feq
+        return f - self._a * f_neq - self._b * paddle.index_select(f_neq, self.opposite, axis=0)
 
 
 class RegularizedCollision:
-    """Regularized LBM according to Jonas Latt and Bastien Chopard (2006)"""
+    """Regularized LBM according to Jonas Latt and Bastien Chopard (2006)
+
+    The regularized non-equilibrium part w_i H_i:Pi_neq / (2 cs^4) is a linear projection of f - feq;
+    its (Q x Q) matrix is precomputed.
+    """
 
     def __init__(self, lattice, tau):
         self.lattice = lattice
         self.tau = tau
-        self.Q_matrix = pdzeros([lattice.Q, lattice.D, lattice.D], device=lattice.device, dtype=lattice.dtype)
+        e = lattice.stencil.e
+        cs2 = lattice.stencil.cs ** 2
+        # second-order Hermite polynomials H_iab = e_ia e_ib - cs^2 delta_ab
+        hermite = e[:, :, None] * e[:, None, :] - cs2 * np.eye(lattice.D)
+        self.Q_matrix = lattice.convert_to_tensor(hermite)
+        projector = np.einsum("qab,ka,kb->qk", hermite, e, e) * lattice.stencil.w[:, None] / (2 * cs2 ** 2)
+        self.projector = lattice.convert_to_tensor(projector)
 
-        for a in range(lattice.Q):
-            for b in range(lattice.D):
-                for c in range(lattice.D):
-                    self.Q_matrix[a, b, c] = lattice.e[a, b] * lattice.e[a, c]
-                    if b == c:
-                        self.Q_matrix[a, b, c] -= lattice.cs * lattice.cs
+    def __call__(self, f):
+        rho, j = self.lattice.moments(f)
+        feq = self.lattice.equilibrium(rho, j / rho)
+        return feq + (1. - 1. / self.tau) * self.lattice.mv(self.projector, f - feq)
+
+
+class RecursiveRegularizedCollision(RegularizedCollision):
+    """Recursive regularized LBM for D3Q27 according to Malaspinas (2015)
+
+    In addition to the projection of :class:`RegularizedCollision`, the third-order non-equilibrium Hermite
+    coefficients are reconstructed recursively, a3_abc = u_a Pi_bc + u_b Pi_ac + u_c Pi_ab,
+    for the components that the D3Q27 stencil resolves (all except xxx, yyy, zzz).
+    """
+
+    def __init__(self, lattice, tau):
+        super(RecursiveRegularizedCollision, self).__init__(lattice, tau)
+        assert lattice.Q == 27, LettuceException("RecursiveRegularizedCollision only realized for D3Q27")
+        e = lattice.stencil.e
+        cs2 = lattice.stencil.cs ** 2
+        delta = np.eye(lattice.D)
+        hermite = (
+                e[:, :, None, None] * e[:, None, :, None] * e[:, None, None, :]
+                - cs2 * (e[:, :, None, None] * delta[None, None, :, :]
+                         + e[:, None, :, None] * delta[None, :, None, :]
+                         + e[:, None, None, :] * delta[None, :, :, None])
+        )
+        resolved = 1 - np.einsum("ab,bc->abc", delta, delta)
+        self.third_order = lattice.convert_to_tensor(
+            hermite * resolved * lattice.stencil.w[:, None, None, None] / (6 * cs2 ** 3)
+        )
 
     def __call__(self, f):
-        rho = self.lattice.rho(f)
-        u = self.lattice.u(f, rho=rho)
+        rho, j = self.lattice.moments(f)
+        u = j / rho
         feq = self.lattice.equilibrium(rho, u)
-        pi_neq = self.lattice.shear_tensor(f - feq)
-        cs4 = self.lattice.cs ** 4
+        f_neq = f - feq
+        pi = self.lattice.shear_tensor(f_neq)
+        a3 = u[:, None, None] * pi[None, :, :] + u[None, :, None] * pi[:, None, :] + u[None, None, :] * pi[:, :, None]
+        f_neq = self.lattice.mv(self.projector, f_neq) + self.lattice.einsum("qabc,abc->q", [self.third_order, a3])
+        return feq + (1. - 1. / self.tau) * f_neq
 
-        pi_neq = self.lattice.einsum("qab,ab->q", [self.Q_matrix, pi_neq])
-        pi_neq = self.lattice.einsum("q,q->q", [self.lattice.w, pi_neq])
 
-        fi1 = pi_neq / (2 * cs4)
-        f = feq + (1. - 1. / self.tau) * fi1
+class _KBCCollision:
+    """Matrix form of the entropic KBC operator.
 
-        return f
+    The shear part delta_s = s(f) - s(feq) is linear in f - feq; its (Q x Q) projection is built once from
+    `kbc_moment_transform` and `compute_s_seq_from_m` applied to the unit vectors (each of which has unit density).
+    """
 
+    def _shear_projection(self, basis_shape):
+        basis = paddle.eye(self.lattice.Q, dtype=self.lattice.dtype).reshape(basis_shape)
+        s = self.compute_s_seq_from_m(basis, self.kbc_moment_transform(basis))
+        return s.reshape([self.lattice.Q, self.lattice.Q])
 
-class KBCCollision2D:
+    def __call__(self, f):
+        rho, j = self.lattice.moments(f)
+        feq = self.lattice.equilibrium(rho, j / rho)
+        f_neq = f - feq
+        delta_s = self.lattice.mv(self.shear_projection, f_neq)
+        delta_h = f_neq - delta_s
+        delta_h_feq = delta_h / feq
+        sum_s = self.lattice.rho(delta_s * delta_h_feq)
+        sum_h = self.lattice.rho(delta_h * delta_h_feq)
+        gamma_stab = 1. / self.beta - (2 - 1. / self.beta) * sum_s / sum_h
+        gamma_stab = paddle.where(
+            paddle.isnan(gamma_stab) | (gamma_stab < 1E-15), paddle.full_like(gamma_stab, 2.0), gamma_stab
+        )
+        return f - self.beta * (2 * delta_s + gamma_stab * delta_h)
+
+
+class KBCCollision2D(_KBCCollision):
     """Entropic multi-relaxation time model according to Karlin et al. in two dimensions"""
 
     def __init__(self, lattice, tau):
@@ -112,10 +225,12 @@ class KBCCollision2D:
         self.beta = 1. / (2 * tau)
 
         # Build a matrix that contains the indices
-        self.M = pdzeros([3, 3, 9], device=lattice.device, dtype=lattice.dtype)
-        for i in range(3):
-            for j in range(3):
-                self.M[i, j] = lattice.e[:, 0] ** i * lattice.e[:, 1] ** j
+        powers = np.arange(3)
+        e = lattice.stencil.e
+        self.M = lattice.convert_to_tensor(
+            e[:, 0] ** powers[:, None, None] * e[:, 1] ** powers[None, :, None]
+        )
+        self.shear_projection = self._shear_projection([lattice.Q, lattice.Q, 1])
 
     def kbc_moment_transform(self, f):
         """Transforms the f into the KBC moment representation"""
@@ -146,43 +261,8 @@ class KBCCollision2D:
 
         return s
 
-    def __call__(self, f):
-        # the deletes are not part of the algorithm, they just keep the memory usage lower
-        rho = self.lattice.rho(f)
-        u = self.lattice.u(f, rho=rho)
-        feq = self.lattice.equilibrium(rho, u)
-        # k = paddle.zeros_like(f)
-
-        m = self.kbc_moment_transform(f)
-        delta_s = self.compute_s_seq_from_m(f, m)
-
-        # k[0] = m[0, 0]
-        # k[1] = m[0, 0] / 2. * m[1, 0]
-        # k[2] = m[0, 0] / 2. * m[0, 1]
-        # k[3] = -m[0, 0] / 2. * m[1, 0]
-        # k[4] = -m[0, 0] / 2. * m[0, 1]
-        # k[5] = 0
-        # k[6] = 0
-        # k[7] = 0
-        # k[8] = 0
-
-        m = self.kbc_moment_transform(feq)
-
-        delta_s -= self.compute_s_seq_from_m(f, m)
-        del m
-        delta_h = f - feq - delta_s
-
-        sum_s = self.lattice.rho(delta_s * delta_h / feq)
-        sum_h = self.lattice.rho(delta_h * delta_h / feq)
-        del feq
-        gamma_stab = 1. / self.beta - (2 - 1. / self.beta) * sum_s / sum_h
-        gamma_stab[gamma_stab < 1E-15] = 2.0
-        gamma_stab[paddle.isnan(gamma_stab)] = 2.0
-        f = f - self.beta * (2 * delta_s + gamma_stab * delta_h)
-        return f
-
 
-class KBCCollision3D:
+class KBCCollision3D(_KBCCollision):
     """Entropic multi-relaxation time-relaxation time model according to Karlin et al. in three dimensions"""
 
     def __init__(self, lattice, tau):
@@ -192,11 +272,14 @@ class KBCCollision3D:
         self.beta = 1. / (2 * tau)
 
         # Build a matrix that contains the indices
-        self.M = pdzeros([3, 3, 3, 27], device=lattice.device, dtype=lattice.dtype)
-        for i in range(3):
-            for j in range(3):
-                for k in range(3):
-                    self.M[i, j, k] = lattice.e[:, 0] ** i * lattice.e[:, 1] ** j * lattice.e[:, 2] ** k
+        powers = np.arange(3)
+        e = lattice.stencil.e
+        self.M = lattice.convert_to_tensor(
+            e[:, 0] ** powers[:, None, None, None]
+            * e[:, 1] ** powers[None, :, None, None]
+            * e[:, 2] ** powers[None, None, :, None]
+        )
+        self.shear_projection = self._shear_projection([lattice.Q, lattice.Q, 1, 1])
 
     def kbc_moment_transform(self, f):
         """Transforms the f into the KBC moment representation"""
@@ -239,39 +322,6 @@ class KBCCollision3D:
 
         return s
 
-    def __call__(self, f):
-        # the deletes are not part of the algorithm, they just keep the memory usage lower
-        feq = self.lattice.equilibrium(self.lattice.rho(f), self.lattice.u(f))
-        # k = paddle.zeros_like(f)
-
-        m = self.kbc_moment_transform(f)
-        delta_s = self.compute_s_seq_from_m(f, m)
-
-        # k[1] = m[0, 0, 0] / 6. * (3. * m[1, 0, 0])
-        # k[0] = m[0, 0, 0]
-        # k[2] = -k[1]
-        # k[3] = m[0, 0, 0] / 6. * (3. * m[0, 1, 0])
-        # k[4] = -k[3]
-        # k[5] = m[0, 0, 0] / 6. * (3. * m[0, 0, 1])
-        # k[6] = -k[5]
-
-        m = self.kbc_moment_transform(feq)
-
-        delta_s -= self.compute_s_seq_from_m(f, m)
-        del m
-        delta_h = f - feq - delta_s
-
-        sum_s = self.lattice.rho(delta_s * delta_h / feq)
-        sum_h = self.lattice.rho(delta_h * delta_h / feq)
-        del feq
-        gamma_stab = 1. / self.beta - (2 - 1. / self.beta) * sum_s / sum_h
-        gamma_stab[gamma_stab < 1E-15] = 2.0
-        # Detect NaN
-        gamma_stab[paddle.isnan(gamma_stab)] = 2.0
-        f = f - self.beta * (2 * delta_s + gamma_stab * delta_h)
-
-        return f
-
 
 class SmagorinskyCollision:
     """Smagorinsky large eddy simulation (LES) collision model with BGK operator."""
@@ -285,9 +335,9 @@ class SmagorinskyCollision:
         self.constant = smagorinsky_constant
 
     def __call__(self, f):
-        rho = self.lattice.rho(f)
-        u_eq = 0 if self.force is None else self.force.u_eq(f)
-        u = self.lattice.u(f) + u_eq
+        rho, j = self.lattice.moments(f)
+        u_eq = 0 if self.force is None else self.force.u_eq(f, rho)
+        u = j / rho + u_eq
         feq = self.lattice.equilibrium(rho, u)
         S_shear = self.lattice.shear_tensor(f - feq)
         S_shear /= (2.0 * rho * self.lattice.cs ** 2)
@@ -304,6 +354,110 @@ class SmagorinskyCollision:
         return f - 1.0 / self.tau_eff * (f - feq) + Si
 
 
+class LESCollision:
+    """BGK collision with a subgrid-scale eddy viscosity for large eddy simulations (LES).
+
+    The subgrid `model` returns the effective relaxation time per node in one pass (no iteration) from the density,
+    velocity and non-equilibrium part of f; see :class:`SmagorinskyModel` (default), :class:`WALEModel`,
+    and :class:`VremanModel`. Nothing grid-sized is stored between steps.
+    For ensembles, `tau` can hold one relaxation time per member.
+    """
+
+    def __init__(self, lattice, tau, model=None, force=None):
+        self.force = force
+        self.lattice = lattice
+        self.tau = ensemble_parameter(lattice, tau)
+        self.model = SmagorinskyModel() if model is None else model
+
+    def __call__(self, f):
+        rho, j = self.lattice.moments(f)
+        u_eq = 0 if self.force is None else self.force.u_eq(f, rho)
+        u = j / rho + u_eq
+        feq = self.lattice.equilibrium(rho, u)
+        f_neq = f - feq
+        tau_eff = self.model.relaxation_time(self.lattice, self.tau, rho, u, f_neq)
+        Si = 0 if self.force is None else self.force.source_term(u)
+        return f - 1.0 / tau_eff * f_neq + Si
+
+
+class SmagorinskyModel:
+    """Smagorinsky model with the closed-form relaxation time of Hou et al. (1996).
+
+    The eddy viscosity (C Delta)^2 |S| depends on the effective relaxation time through the strain rate
+    S = -Pi_neq / (2 rho cs^2 tau_eff), which gives a quadratic equation for tau_eff.
+    """
+
+    def __init__(self, constant=0.17):
+        self.constant = constant
+
+    def relaxation_time(self, lattice, tau, rho, u, f_neq):
+        pi_neq = lattice.shear_tensor(f_neq)
+        pi_norm = paddle.sqrt(2 * lattice.einsum("ab,ab->", [pi_neq, pi_neq]))
+        return 0.5 * (tau + paddle.sqrt(tau ** 2 + 2 * self.constant ** 2 * pi_norm / (rho[0] * lattice.cs ** 4)))
+
+
+class WALEModel:
+    """Wall-adapting local eddy-viscosity model (Nicoud and Ducros, 1999).
+
+    Uses the velocity gradient from central differences and thus requires a periodic grid.
+    """
+    node_local = False
+
+    def __init__(self, constant=0.5):
+        self.constant = constant
+
+    def relaxation_time(self, lattice, tau, rho, u, f_neq):
+        g = _velocity_gradient(lattice, u)
+        g2 = lattice.einsum("ac,cb->ab", [g, g])
+        trace = sum(g2[a, a] for a in range(lattice.D))
+        identity = paddle.eye(lattice.D, dtype=g.dtype).reshape([lattice.D, lattice.D] + [1] * (len(g.shape) - 2))
+        s = 0.5 * (g + _transpose(g))
+        sd = 0.5 * (g2 + _transpose(g2)) - trace / lattice.D * identity
+        ss = lattice.einsum("ab,ab->", [s, s])
+        sdsd = lattice.einsum("ab,ab->", [sd, sd])
+        denominator = ss ** 2.5 + sdsd ** 1.25
+        nu_t = self.constant ** 2 * paddle.where(
+            denominator > 0, sdsd ** 1.5 / denominator, paddle.zeros_like(denominator)
+        )
+        return tau + nu_t / lattice.cs ** 2
+
+
+class VremanModel:
+    """Eddy-viscosity model of Vreman (2004); `constant` is about 2.5 times the squared Smagorinsky constant.
+
+    Uses the velocity gradient from central differences and thus requires a periodic grid.
+    """
+    node_local = False
+
+    def __init__(self, constant=0.07):
+        self.constant = constant
+
+    def relaxation_time(self, lattice, tau, rho, u, f_neq):
+        g = _velocity_gradient(lattice, u)
+        beta = lattice.einsum("im,jm->ij", [g, g])
+        b_beta = 0
+        for i in range(lattice.D):
+            for j in range(i + 1, lattice.D):
+                b_beta = b_beta + beta[i, i] * beta[j, j] - beta[i, j] ** 2
+        alpha_alpha = lattice.einsum("ab,ab->", [g, g])
+        nu_t = self.constant * paddle.sqrt(paddle.where(
+            alpha_alpha > 0, paddle.clip(b_beta, min=0) / alpha_alpha, paddle.zeros_like(alpha_alpha)
+        ))
+        return tau + nu_t / lattice.cs ** 2
+
+
+def _velocity_gradient(lattice, u):
+    """du_a/dx_b by second-order central differences on a periodic grid, shape (D, D, *grid)."""
+    return paddle.stack([
+        (pdroll(u, shifts=-1, dims=b - lattice.D) - pdroll(u, shifts=1, dims=b - lattice.D)) / 2
+        for b in range(lattice.D)
+    ], axis=1)
+
+
+def _transpose(tensor):
+    return paddle.transpose(tensor, perm=[1, 0] + list(range(2, len(tensor.shape))))
+
+
 class BGKInitialization:
     """Keep velocity constant."""
 
@@ -329,3 +483,59 @@ class BGKInitialization:
         f = self.moment_transformation.inverse_transform(mnew)
         return f
 
+
+class ChunkedCollision:
+    """Applies a collision operator slab by slab along the first spatial axis to bound its temporary memory.
+
+    The slab size is chosen so that `temporaries` full-size temporaries of one slab
+    (e.g. feq, delta_s and delta_h of the KBC operators) fit into `memory_budget` bytes;
+    each slab holds at least one layer of nodes. The collision must act node-wise; tensor attributes of its force
+    (e.g. an acceleration field) are cut to the slabs.
+
+    Examples
+    --------
+    >>> collision = ChunkedCollision(KBCCollision3D(lattice, tau), lattice, memory_budget=2 * 1024 ** 3)
+    """
+
+    def __init__(self, collision, lattice, memory_budget, temporaries=8):
+        self.collision = collision
+        self.lattice = lattice
+        self.memory_budget = memory_budget
+        self.temporaries = temporaries
+        _check_node_local(collision, "chunking")
+        self._slabs = None
+        self._slabs_shape = None
+
+    def slab_size(self, f_shape):
+        """Number of layers along the first spatial axis that are collided at once."""
+        itemsize = paddle.zeros([1], dtype=self.lattice.dtype).element_size()
+        layer_bytes = int(np.prod(f_shape)) // f_shape[-self.lattice.D] * itemsize
+        return max(1, int(self.memory_budget // (self.temporaries * layer_bytes)))
+
+    def __call__(self, f):
+        size = f.shape[-self.lattice.D]
+        slab_size = self.slab_size(f.shape)
+        if slab_size >= size:
+            return self.collision(f)
+        if self._slabs_shape != list(f.shape) + [slab_size]:
+            self._slabs = self._cut_slabs(f.shape, slab_size)
+            self._slabs_shape = list(f.shape) + [slab_size]
+        f_post = paddle.empty_like(f)
+        for slab, collision in self._slabs:
+            f_post[slab] = collision(f[slab])
+        return f_post
+
+    def _cut_slabs(self, f_shape, slab_size):
+        """Index and collision of each slab; collisions with a force get a copy whose fields are cut to the slab."""
+        D = self.lattice.D
+        size = f_shape[-D]
+        leading = (slice(None),) * (len(f_shape) - D)
+        slabs = []
+        for start in range(0, size, slab_size):
+            stop = min(start + slab_size, size)
+            collision = self.collision
+            if getattr(collision, "force", None) is not None:
+                collision = deepcopy(collision, {id(self.lattice): self.lattice})
+                _cut_fields(collision.force, f_shape[-D:], [(-D, np.arange(start, stop))])
+            slabs.append((leading + (slice(start, stop),), collision))
+        return slabs
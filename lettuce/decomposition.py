@@ -0,0 +1,258 @@
+"""
+Domain decomposition across worker processes on a single node.
+"""
+
+import io
+import os
+import queue
+import pickle
+import traceback
+import weakref
+import multiprocessing
+from copy import deepcopy
+from multiprocessing import shared_memory
+from timeit import default_timer as timer
+
+import numpy as np
+import paddle
+
+from lettuce.util import LettuceException, _check_cut, _cut_fields, _take
+from lettuce.simulation import Simulation
+
+__all__ = ["DecomposedSimulation"]
+
+
+class DecomposedSimulation(Simulation):
+    """Simulation that splits the grid into slabs along one axis and advances each slab in its own process.
+
+    The distribution function lives in one shared-memory buffer. In every step, each worker collides its slab,
+    writes it to the buffer, and reads it back together with one halo layer on each side (wrapped periodically),
+    streams the padded slab, and applies the boundaries to its own nodes.
+    Since collision and boundaries act node-wise and the halos hold exactly the populations that a roll over
+    the full grid would move into the slab, the result is identical to :class:`Simulation`.
+
+    Masks and tensor attributes of boundaries (e.g. `mask`) and of the collision's force (e.g. an acceleration
+    field) are cut to the slab. Outlets have to lie on a side of the domain that is not split, i.e. their direction
+    must not point along `axis`. The collision has to act node-wise.
+    The reporters are called on the gathered distribution function, which requires a synchronization
+    of all workers after every step; without reporters, the workers run all steps of :meth:`step` in one go.
+
+    Workers are spawned on the first call of :meth:`step` and live until :meth:`close` is called
+    or the simulation is garbage-collected. As with all spawned processes, scripts have to guard the main
+    module by ``if __name__ == "__main__":``.
+
+    Parameters
+    ----------
+    num_workers : int
+        Number of processes (slabs); defaults to the number of cores.
+    axis : int
+        Spatial axis along which the grid is split; defaults to the last one.
+    """
+
+    def __init__(self, flow, lattice, collision, streaming, num_workers=None, axis=-1):
+        super().__init__(flow, lattice, collision, streaming)
+        if not -lattice.D <= axis < lattice.D:
+            raise LettuceException(f"Invalid axis {axis} for a {lattice.D}D grid.")
+        # count from the back, so that the axis is the same for fields with and without leading dimensions
+        self.axis = axis - lattice.D if axis >= 0 else axis
+        self.num_workers = os.cpu_count() if num_workers is None else num_workers
+        size = self.f.shape[self.axis]
+        if not 1 <= self.num_workers <= size:
+            raise LettuceException(f"Can not split {size} nodes among {self.num_workers} workers.")
+        _check_cut(self._boundaries, collision, [self.axis], "domain decomposition")
+        self.halo = int(np.abs(lattice.stencil.e[:, self.axis]).max())
+        self.slabs = [(int(s[0]), int(s[-1]) + 1) for s in np.array_split(np.arange(size), self.num_workers)]
+        # seconds between checks for dead workers while waiting for their results
+        self.poll_interval = 1.0
+        self._workers = None
+
+    def compile(self, steps_per_call=1, **kwargs):
+        raise LettuceException("DecomposedSimulation can not be compiled.")
+
+    def step(self, num_steps):
+        """Take num_steps stream-and-collision steps and return performance in MLUPS."""
+        start = timer()
+        if self._workers is None:
+            self._start_workers()
+        self._bind_moments()
+        if self.i == 0:
+            self._report()
+        self._shared[...] = self.f.numpy()
+        steps_per_call = 1 if self.reporters else num_steps
+        num_remaining = num_steps
+        while num_remaining > 0:
+            n = min(steps_per_call, num_remaining)
+            self._run(n)
+            num_remaining -= n
+            self.i += n
+            if self.reporters:
+                self.f = self.lattice.convert_to_tensor(self._shared)
+                self._bind_moments()
+                self._report()
+        self.f = self.lattice.convert_to_tensor(self._shared)
+        self._bind_moments()
+        end = timer()
+        seconds = end - start
+        num_grid_points = self.lattice.rho(self.f).numel()
+        mlups = num_steps * num_grid_points / 1e6 / seconds
+        return mlups
+
+    def close(self):
+        """Shut down the workers and release the shared memory."""
+        if self._workers is not None:
+            self._finalizer()
+            self._workers = None
+
+    def _run(self, num_steps):
+        for commands in self._commands:
+            commands.put(num_steps)
+        errors = []
+        num_pending = len(self._workers)
+        while num_pending > 0:
+            try:
+                _, error = self._results.get(timeout=self.poll_interval)
+            except queue.Empty:
+                # a worker that dies outside of its step loop (e.g. while unpickling its setup) posts no result
+                dead = [worker for worker in self._workers if not worker.is_alive()]
+                if dead:
+                    message = (f"Worker {self._workers.index(dead[0])} exited with code {dead[0].exitcode} "
+                               f"before finishing its steps.")
+                    self._barrier.abort()
+                    self.close()
+                    raise LettuceException(message)
+                continue
+            num_pending -= 1
+            if error is not None:
+                errors.append(error)
+        if errors:
+            self.close()
+            raise LettuceException("Worker failed:\n" + errors[0])
+
+    def _start_workers(self):
+        context = multiprocessing.get_context("spawn")
+        f = self.f.numpy()
+        memory = shared_memory.SharedMemory(create=True, size=f.nbytes)
+        self._shared = np.ndarray(f.shape, dtype=f.dtype, buffer=memory.buf)
+        self._barrier = context.Barrier(self.num_workers)
+        self._results = context.Queue()
+        self._commands = [context.Queue() for _ in self.slabs]
+        self._workers = []
+        # registered before any worker starts, so that the shared memory is released if starting fails
+        self._finalizer = weakref.finalize(self, _shut_down, self._workers, self._commands, memory)
+        # the moment cache is bound to the global f; the workers do not need it
+        moment_cache, self.lattice.moment_cache = self.lattice.moment_cache, None
+        try:
+            for rank, slab in enumerate(self.slabs):
+                worker = context.Process(
+                    target=_work,
+                    args=(rank, slab, _dumps(self._local_setup(slab)), memory.name, f.shape, f.dtype,
+                          self._barrier, self._commands[rank], self._results),
+                    daemon=True
+                )
+                worker.start()
+                self._workers.append(worker)
+        except BaseException:
+            self.close()
+            raise
+        finally:
+            self.lattice.moment_cache = moment_cache
+
+    def _local_setup(self, slab):
+        start, stop = slab
+        size = self.f.shape[self.axis]
+        own = np.arange(start, stop)
+        padded = np.arange(start - self.halo, stop + self.halo) % size
+        grid_shape = self.f.shape[-self.lattice.D:]
+        boundaries = deepcopy(self._boundaries, {id(self.lattice): self.lattice})
+        for boundary in boundaries:
+            _cut_fields(boundary, grid_shape, [(self.axis, own)])
+        collision = deepcopy(self.collision, {id(self.lattice): self.lattice})
+        if getattr(collision, "force", None) is not None:
+            _cut_fields(collision.force, grid_shape, [(self.axis, own)])
+        streaming = deepcopy(self.streaming, {id(self.lattice): self.lattice})
+        no_stream_mask = self.streaming.no_stream_mask
+        streaming.no_stream_mask = None if no_stream_mask is None else _take(no_stream_mask, padded, self.axis)
+        return dict(
+            lattice=self.lattice,
+            collision=collision,
+            streaming=streaming,
+            boundaries=boundaries,
+            no_collision_mask=_take(self.no_collision_mask, own, self.axis),
+            padded=padded,
+            axis=self.axis,
+            halo=self.halo
+        )
+
+
+def _dumps(setup):
+    """Pickle the worker setup with its tensors as numpy arrays; paddle's own tensor pickling
+    (by shared file) does not survive the transfer to spawned processes."""
+    buffer = io.BytesIO()
+    _NumpyTensorPickler(buffer).dump(setup)
+    return buffer.getvalue()
+
+
+class _NumpyTensorPickler(pickle.Pickler):
+    def reducer_override(self, obj):
+        if isinstance(obj, paddle.Tensor):
+            return _rebuild_tensor, (obj.numpy(),)
+        return NotImplemented
+
+
+def _rebuild_tensor(array):
+    return paddle.to_tensor(array)
+
+
+def _shut_down(workers, commands, memory):
+    for queue in commands:
+        queue.put(None)
+    for worker in workers:
+        worker.join(timeout=10)
+        if worker.is_alive():
+            worker.terminate()
+    memory.close()
+    memory.unlink()
+
+
+def _work(rank, slab, setup, memory_name, shape, dtype, barrier, commands, results):
+    setup = pickle.loads(setup)
+    lattice = setup["lattice"]
+    collision = setup["collision"]
+    streaming = setup["streaming"]
+    boundaries = setup["boundaries"]
+    no_collision_mask = setup["no_collision_mask"]
+    padded = setup["padded"]
+    axis = setup["axis"]
+    halo = setup["halo"]
+
+    memory = shared_memory.SharedMemory(name=memory_name)
+    shared = np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+    own = [slice(None)] * len(shape)
+    own[axis] = slice(*slab)
+    own = tuple(own)
+    interior = [slice(None)] * len(shape)
+    interior[axis] = slice(halo, halo + slab[1] - slab[0])
+    interior = tuple(interior)
+
+    while True:
+        num_steps = commands.get()
+        if num_steps is None:
+            break
+        try:
+            f = lattice.convert_to_tensor(shared[own])
+            for _ in range(num_steps):
+                f = paddle.where_(no_collision_mask.logical_not(), collision(f), f)
+                shared[own] = f.numpy()
+                barrier.wait()
+                f = lattice.convert_to_tensor(np.take(shared, padded, axis=axis))
+                barrier.wait()
+                f = streaming(f)[interior]
+                for boundary in boundaries:
+                    f = boundary(f)
+            shared[own] = f.numpy()
+            results.put((rank, None))
+        except Exception:
+            barrier.abort()
+            results.put((rank, traceback.format_exc()))
+    del shared
+    memory.close()
@@ -1,9 +1,10 @@
 
+import numpy as np
 import paddle
 from lettuce.utils import pdtensordot
 
 __all__ = ["Equilibrium", "QuadraticEquilibrium", "IncompressibleQuadraticEquilibrium",
-           "QuadraticEquilibrium_LessMemory"]
+           "QuadraticEquilibrium_LessMemory", "UnrolledQuadraticEquilibrium"]
 
 
 class Equilibrium:
@@ -44,6 +45,56 @@ class QuadraticEquilibrium_LessMemory(QuadraticEquilibrium):
         )
 
 
+class UnrolledQuadraticEquilibrium(QuadraticEquilibrium):
+    """Same as the quadratic equilibrium, unrolled for stencils whose velocities have the components -1, 0, 1
+    (e.g. D2Q9, D3Q19, D3Q27).
+
+    e_i*u reduces to sums and differences of velocity components, opposite populations share all terms except
+    the sign of e_i*u, and w*rho is formed once per weight group. Apart from the result,
+    all intermediates have the size of the grid. The lattice selects this equilibrium when the stencil supports it.
+    """
+
+    def __init__(self, lattice):
+        super().__init__(lattice)
+        stencil = lattice.stencil
+        weights, self._weight_group = np.unique(stencil.w, return_inverse=True)
+        # plain Python lists, which graph capture (paddle.jit.to_static) can index
+        self._weights = weights.tolist()
+        self._weight_group = self._weight_group.tolist()
+        self._rest = [i for i, j in enumerate(stencil.opposite) if i == j]
+        self._pairs = [(i, j) for i, j in enumerate(stencil.opposite) if i < j]
+        self._terms = [[(d, int(c)) for d, c in enumerate(e) if c != 0] for e in stencil.e]
+        self._cs2 = float(stencil.cs ** 2)
+
+    @staticmethod
+    def supports(stencil):
+        return bool(np.isin(stencil.e, [-1, 0, 1]).all())
+
+    def __call__(self, rho, u, *args):
+        # not isinstance(rho, paddle.Tensor), which is False for the values of a graph captured by paddle.jit.to_static
+        if len(getattr(rho, "shape", ())) == len(u.shape):
+            rho = rho[0]
+        uxu = u[0] * u[0]
+        for d in range(1, self.lattice.D):
+            uxu = uxu + u[d] * u[d]
+        base = 1 - uxu / (2 * self._cs2)
+        w_rho = [w * rho for w in self._weights]
+        feq = [None] * self.lattice.Q
+        for i in self._rest:
+            feq[i] = w_rho[self._weight_group[i]] * base
+        for i, j in self._pairs:
+            # no `exu is None` test, which graph capture would take for a branch on a tensor
+            (d, sign), rest = self._terms[i][0], self._terms[i][1:]
+            exu = u[d] if sign > 0 else -u[d]
+            for d, sign in rest:
+                exu = exu + u[d] if sign > 0 else exu - u[d]
+            exu = exu / self._cs2
+            even = base + 0.5 * exu * exu
+            feq[i] = w_rho[self._weight_group[i]] * (even + exu)
+            feq[j] = w_rho[self._weight_group[j]] * (even - exu)
+        return paddle.stack(feq)
+
+
 class IncompressibleQuadraticEquilibrium(Equilibrium):
     def __init__(self, lattice, rho0=1.0):
         self.lattice = lattice
@@ -35,16 +35,17 @@ class DecayingTurbulence:
         wavenumber = np.meshgrid(*frequencies)
         wavenorms = np.linalg.norm(wavenumber, axis=0)
         self.wavenumbers = np.arange(int(np.max(wavenorms)))
-        wavemask = (wavenorms[..., None] > self.wavenumbers - 0.5) & (wavenorms[..., None] <= self.wavenumbers + 0.5)
-        return wavenorms, wavenumber, wavemask
+        # shell k holds the wavenumbers in (k - 1/2, k + 1/2]
+        shells = np.ceil(wavenorms - 0.5).astype(np.int64)
+        return wavenorms, wavenumber, shells
 
     def _generate_spectrum(self):
-        wavenorms, wavenumber, wavemask = self._generate_wavenumbers()
+        wavenorms, wavenumber, shells = self._generate_wavenumbers()
         ek = (wavenorms) ** 4 * np.exp(-2 * (wavenorms / self.k0) ** 2)
         ek /= np.sum(ek)
         ek *= self.ic_energy
-        self.spectrum = ek[..., None] * wavemask
-        self.spectrum = np.sum(self.spectrum, axis=tuple((np.arange(self.units.lattice.D))))
+        num_shells = len(self.wavenumbers)
+        self.spectrum = np.bincount(shells.ravel(), weights=ek.ravel(), minlength=num_shells)[:num_shells]
         return ek, wavenumber
 
     def _generate_initial_velocity(self, ek, wavenumber):
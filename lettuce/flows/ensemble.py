@@ -0,0 +1,56 @@
+"""
+Ensembles of flows that are simulated in one distribution tensor.
+"""
+
+import numpy as np
+
+from lettuce.unit import EnsembleUnitConversion
+
+__all__ = ["EnsembleFlow"]
+
+
+class EnsembleFlow:
+    """Batch of B flows on identical, periodic grids.
+
+    The members are stacked along an ensemble axis in front of the grid axes,
+    so that the distribution function has the shape (Q, B, *grid) and every kernel runs once for the whole batch.
+    Per-member relaxation times are passed to the collision as arrays, e.g.
+    ``BGKCollision(lattice, tau=flow.units.relaxation_parameter_lu)``.
+    The kinetic energy and maximum velocity observables are vectorized over the members; Enstrophy,
+    EnergySpectrum and Mass evaluate the members one after the other. Observables put the member axis last.
+    ObservableReporter and VTKReporter write their output per member.
+
+    Examples
+    --------
+    >>> flows = [TaylorGreenVortex2D(64, re, 0.05, lattice) for re in (100, 200, 400)]
+    >>> flow = EnsembleFlow(flows)
+    >>> collision = BGKCollision(lattice, tau=flow.units.relaxation_parameter_lu)
+    >>> simulation = Simulation(flow, lattice, collision, StandardStreaming(lattice))
+    """
+
+    def __init__(self, flows):
+        self.flows = list(flows)
+        assert len(self.flows) > 0, "An ensemble needs at least one flow."
+        shapes = {tuple(np.shape(flow.grid[0])) for flow in self.flows}
+        assert len(shapes) == 1, f"All members of an ensemble need the same grid shape, got {shapes}."
+        assert all(len(flow.boundaries) == 0 for flow in self.flows), \
+            "Ensembles only support periodic flows without boundaries."
+        self.units = EnsembleUnitConversion([flow.units for flow in self.flows])
+
+    def __len__(self):
+        return len(self.flows)
+
+    def initial_solution(self, x):
+        solutions = [flow.initial_solution([xd[b] for xd in x]) for b, flow in enumerate(self.flows)]
+        p = np.stack([p for p, _ in solutions], axis=1)
+        u = np.stack([u for _, u in solutions], axis=1)
+        return p, u
+
+    @property
+    def grid(self):
+        grids = [flow.grid for flow in self.flows]
+        return [np.stack(xd) for xd in zip(*grids)]
+
+    @property
+    def boundaries(self):
+        return []
@@ -14,10 +14,10 @@ import numpy as np
 import paddle
 
 from lettuce.util import LettuceException
-from lettuce.equilibrium import QuadraticEquilibrium
+from lettuce.equilibrium import QuadraticEquilibrium, UnrolledQuadraticEquilibrium
 from lettuce.utils import pdtensor,pdsum
 
-__all__ = ["Lattice"]
+__all__ = ["Lattice", "MomentCache"]
 
 
 class Lattice:
@@ -29,7 +29,19 @@ class Lattice:
         self.e = self.convert_to_tensor(stencil.e)
         self.w = self.convert_to_tensor(stencil.w)
         self.cs = self.convert_to_tensor(stencil.cs)
-        self.equilibrium = QuadraticEquilibrium(self)
+        if UnrolledQuadraticEquilibrium.supports(stencil):
+            self.equilibrium = UnrolledQuadraticEquilibrium(self)
+        else:
+            self.equilibrium = QuadraticEquilibrium(self)
+        self.moment_cache = None
+        self._einsum_plans = {}
+        # rows: 1, e_a, e_a * e_b; see moments
+        e = stencil.e
+        second_moments = (e[:, :, None] * e[:, None, :]).reshape(len(e), -1)
+        self._moment_matrix = self.convert_to_tensor(np.concatenate([np.ones((len(e), 1)), e], axis=1).T)
+        self._moment_matrix_second_order = self.convert_to_tensor(
+            np.concatenate([np.ones((len(e), 1)), e, second_moments], axis=1).T
+        )
 
     def __str__(self):
         return f"Lattice (stencil {self.stencil.__name__}; device {self.device}; dtype {self.dtype})"
@@ -60,19 +72,46 @@ class Lattice:
     def convert_to_numpy(cls, tensor):
         return tensor.detach().cpu().numpy()
 
+    def _cached(self, f):
+        return self.moment_cache is not None and self.moment_cache.holds(f)
+
     def rho(self, f):
         """density"""
+        if self._cached(f):
+            return self.moment_cache.rho
         return pdsum(f, dim=0)[None, ...]
 
     def j(self, f):
         """momentum"""
+        if self._cached(f):
+            return self.moment_cache.j
         return self.einsum("qd,q->d", [self.e, f])
 
+    def moments(self, f, second_order=False):
+        """density and momentum (and the second-order moments Pi_ab, if `second_order`) of f,
+        computed by one matrix product with the (Q, N) view of f"""
+        if self._cached(f) and not second_order:
+            return self.moment_cache.rho, self.moment_cache.j
+        return self._compute_moments(f, second_order)
+
+    def _compute_moments(self, f, second_order=False):
+        matrix = self._moment_matrix_second_order if second_order else self._moment_matrix
+        m = self.einsum("mq,q->m", [matrix, f])
+        rho, j = m[:1], m[1:1 + self.D]
+        if not second_order:
+            return rho, j
+        return rho, j, m[1 + self.D:].reshape([self.D, self.D] + list(m.shape[1:]))
+
     def u(self, f, rho=None, acceleration=None):
         """velocity; the `acceleration` is used to compute the correct velocity in the presence of a forcing scheme."""
-        if rho is None:
-            rho = self.rho(f)
-        v = self.j(f) / rho
+        if self._cached(f):
+            v = self.moment_cache.u
+            rho = self.moment_cache.rho
+        elif rho is None:
+            rho, j = self.moments(f)
+            v = j / rho
+        else:
+            v = self.j(f) / rho
         # apply correction due to forcing, which effectively averages the pre- and post-collision velocity
         correction = 0.0
         if acceleration is not None:
@@ -104,28 +143,165 @@ class Lattice:
 
     def shear_tensor(self, f):
         """computes the shear tensor of a given f in the sense Pi_{\alpha \beta} = f_i * e_{i \alpha} * e_{i \beta}"""
-        shear = self.einsum("qa,qb->qab", [self.e, self.e])
-        shear = self.einsum("q,qab->ab", [f, shear])
-        return shear
+        return self.moments(f, second_order=True)[2]
 
     def mv(self, m, v):
         """matrix-vector multiplication"""
         return self.einsum("ij,j->i", [m, v])
 
     def einsum(self, equation, fields, **kwargs):
-        """Einstein summation on local fields."""
-        input, output = equation.split("->")
-        inputs = input.split(",")
-        for i, inp in enumerate(inputs):
-            if len(inp) == len(fields[i].shape):
-                pass
-            elif len(inp) == len(fields[i].shape) - self.D:
-                inputs[i] += "..."
-                if not output.endswith("..."):
-                    output += "..."
-            else:
-                raise LettuceException("Bad dimension.")
-        equation = ",".join(inputs) + "->" + output
-        return paddle.einsum(equation, fields[0],fields[1])
+        """Einstein summation on local fields.
+
+        Fields can have trailing grid (and ensemble) dimensions in addition to the indices in the equation.
+        The plan of an equation is cached per operand ranks: contractions of a constant tensor with all indices of
+        a local field run as one matmul on the (indices, nodes) view of the field, and products of fields with equal
+        indices run elementwise. Other equations, also with more than two operands, go to `paddle.einsum`.
+        """
+        # a string key, built without tuple() and str.join, and `in` instead of dict.get: the bytecode translator
+        # of paddle.jit.to_static supports none of these and would fall back to dygraph for the whole step
+        ranks = [len(field.shape) for field in fields]
+        key = equation
+        for rank in ranks:
+            key += ":" + str(rank)
+        if key not in self._einsum_plans:
+            self._einsum_plans[key] = _einsum_plan(equation, ranks)
+        return self._einsum_plans[key](fields)
+
+
+def _einsum_plan(equation, ranks):
+    input, output = equation.split("->")
+    inputs = input.split(",")
+    local = []
+    for inp, rank in zip(inputs, ranks):
+        if len(inp) > rank:
+            raise LettuceException("Bad dimension.")
+        # local field; trailing grid (and ensemble) dimensions
+        local.append(len(inp) < rank)
+    unique = all(len(set(indices)) == len(indices) for indices in inputs + [output])
+    if len(inputs) == 2 and unique:
+        if local.count(True) == 1:
+            i_local = local.index(True)
+            i_constant = 1 - i_local
+            local_indices, constant_indices = inputs[i_local], inputs[i_constant]
+            free = [index for index in constant_indices if index not in local_indices]
+            if set(local_indices) <= set(constant_indices) and sorted(output) == sorted(free):
+                permutation = [constant_indices.index(index) for index in output + local_indices]
+                return _MatmulPlan(i_constant, i_local, len(output), len(local_indices), permutation)
+        if inputs[0] == inputs[1] and output in (inputs[0], "") and (ranks[0] == ranks[1] or not all(local)):
+            return _ProductPlan(len(inputs[0]), max(ranks), reduce=(output == ""))
+    if any(local):
+        inputs = [inp + "..." if is_local else inp for inp, is_local in zip(inputs, local)]
+        output += "..."
+    return _EinsumPlan(",".join(inputs) + "->" + output)
+
+
+class _EinsumPlan:
+    def __init__(self, equation):
+        self.equation = equation
+
+    def __call__(self, fields):
+        return paddle.einsum(self.equation, *fields)
+
+
+class _MatmulPlan:
+    """Constant tensor contracted with all explicit indices of a local field."""
+
+    def __init__(self, i_constant, i_local, num_output, num_local, permutation):
+        self.i_constant = i_constant
+        self.i_local = i_local
+        self.num_output = num_output
+        self.num_local = num_local
+        self.permutation = None if permutation == sorted(permutation) else permutation
+
+    def __call__(self, fields):
+        constant, field = fields[self.i_constant], fields[self.i_local]
+        if self.permutation is not None:
+            constant = paddle.transpose(constant, self.permutation)
+        output_shape = list(constant.shape[:self.num_output])
+        trailing = list(field.shape[self.num_local:])
+        # no np.prod, which graph capture can not translate
+        num_rows = 1
+        for size in output_shape:
+            num_rows *= size
+        constant = constant.reshape([num_rows, -1])
+        field = field.reshape([constant.shape[1], -1])
+        return paddle.matmul(constant, field).reshape(output_shape + trailing)
+
+
+class _ProductPlan:
+    """Elementwise product of two fields with the same explicit indices, optionally summed over them."""
 
+    def __init__(self, num_indices, rank, reduce):
+        self.num_indices = num_indices
+        self.rank = rank
+        self.reduce = reduce
 
+    def __call__(self, fields):
+        x, y = [field.reshape(list(field.shape) + [1] * (self.rank - len(field.shape))) for field in fields]
+        product = x * y
+        if self.reduce:
+            return pdsum(product, dim=list(range(self.num_indices)))
+        return product
+
+
+
+
+class MomentCache:
+    """Macroscopic moments (rho, j, u) of one distribution function.
+
+    A simulation binds its current distribution to the cache once per step (see :meth:`bind`). As long as the
+    cache is registered as `lattice.moment_cache`, `Lattice.rho`, `Lattice.j`, and `Lattice.u` called with the
+    bound tensor compute each moment only once and return the stored value afterwards.
+    The binding is by identity; moments computed before an in-place modification of the bound tensor
+    (e.g. ``f[0] = 2 * f[0]``) are dropped, since paddle counts such modifications in the tensor's inplace version.
+    """
+
+    def __init__(self, lattice):
+        self.lattice = lattice
+        self.f = None
+        self._version = None
+        self._rho = None
+        self._j = None
+        self._u = None
+
+    def bind(self, f):
+        """Tie the cache to f; the moments are computed on first access. Binding the bound tensor again is a no-op."""
+        if f is not self.f:
+            self.invalidate()
+            self.f = f
+            self._version = f._inplace_version()
+
+    def holds(self, f):
+        """True if f is the bound tensor. Moments of an earlier inplace version of f are dropped."""
+        if f is not self.f:
+            return False
+        version = f._inplace_version()
+        if version != self._version:
+            self._rho, self._j, self._u = None, None, None
+            self._version = version
+        return True
+
+    def invalidate(self):
+        self.f = None
+        self._version = None
+        self._rho = None
+        self._j = None
+        self._u = None
+
+    @property
+    def rho(self):
+        if self._rho is None:
+            self._rho, self._j = self.lattice._compute_moments(self.f)
+        return self._rho
+
+    @property
+    def j(self):
+        if self._j is None:
+            self._rho, self._j = self.lattice._compute_moments(self.f)
+        return self._j
+
+    @property
+    def u(self):
+        if self._u is None:
+            self._u = self.j / self.rho
+        return self._u
@@ -44,7 +44,11 @@ class Moments:
 
 class Transform:
     """Base class that defines the signature for all moment (and cumulant) transforms.
+
+    Transforms whose `equilibrium` returns the moments of the lattice equilibrium set `lattice_equilibrium`,
+    which lets linear MRT collisions relax f - feq without the moment equilibrium.
     """
+    lattice_equilibrium = False
 
     def __init__(self, lattice, names=None):
         self.lattice = lattice
@@ -87,6 +91,7 @@ class D1Q3Transform(Transform):
     ])
     names = ["rho", "j", "e"]
     supported_stencils = [D1Q3]
+    lattice_equilibrium = True
 
     def __init__(self, lattice):
         super(D1Q3Transform, self).__init__(lattice, self.names)
@@ -129,6 +134,7 @@ class D2Q9Dellar(Transform):
     )
     names = ['rho', 'jx', 'jy', 'Pi_xx', 'Pi_xy', 'PI_yy', 'N', 'Jx', 'Jy']
     supported_stencils = [D2Q9]
+    lattice_equilibrium = True
 
     def __init__(self, lattice):
         super(D2Q9Dellar, self).__init__(
@@ -7,7 +7,7 @@ The `__call__` function takes f as an argument and returns a torch tensor.
 
 import paddle
 import numpy as np
-from lettuce.util import torch_gradient
+from lettuce.util import FiniteDifferenceDerivative
 from packaging import version
 from lettuce.utils import *
 
@@ -23,12 +23,30 @@ class Observable:
         raise NotImplementedError
 
 
+def _member_observables(observable_class, lattice, flow, *args, **kwargs):
+    """One observable per member of an ensemble flow (see EnsembleFlow), or None for a single flow."""
+    flows = getattr(flow, "flows", None)
+    if flows is None:
+        return None
+    return [observable_class(lattice, member, *args, **kwargs) for member in flows]
+
+
+def _stack_members(members, field, method="__call__"):
+    """Evaluate the member observables on their slices (..., b, *grid) of the field; the member axis goes last."""
+    D = members[0].lattice.D
+    index = [slice(None)] * (len(field.shape) - D - 1)
+    return paddle.stack([getattr(member, method)(field[tuple(index + [b])]) for b, member in enumerate(members)],
+                        axis=-1)
+
+
 class MaximumVelocity(Observable):
     """Maximum velocitiy"""
 
     def __call__(self, f):
         u = self.lattice.u(f)
-        return self.flow.units.convert_velocity_to_pu(pdnorm(u, dim=0).max())
+        # reduce over the grid only; ensembles (see EnsembleFlow) yield one value per member
+        grid_axes = list(range(-self.lattice.D, 0))
+        return self.flow.units.convert_velocity_to_pu(pdmaxnorm(u, dim=0, reduce_dim=grid_axes))
 
 
 class IncompressibleKineticEnergy(Observable):
@@ -36,7 +54,9 @@ class IncompressibleKineticEnergy(Observable):
 
     def __call__(self, f):
         dx = self.flow.units.convert_length_to_pu(1.0)
-        kinE = self.flow.units.convert_incompressible_energy_to_pu(pdsum(self.lattice.incompressible_energy(f)))
+        grid_axes = list(range(-self.lattice.D, 0))
+        kinE = self.flow.units.convert_incompressible_energy_to_pu(
+            pdsum(self.lattice.incompressible_energy(f), dim=grid_axes))
         kinE *= dx ** self.lattice.D
         return kinE
 
@@ -44,48 +64,74 @@ class IncompressibleKineticEnergy(Observable):
 class Enstrophy(Observable):
     """The integral of the vorticity
 
+    Parameters
+    ----------
+    derivative : FiniteDifferenceDerivative or SpectralDerivative
+        The derivative backend; defaults to sixth-order finite differences.
+
     Notes
     -----
-    The function only works for periodic domains
+    The function only works for periodic domains.
+    For ensembles (see EnsembleFlow), the members are evaluated one after the other; one value per member.
     """
 
+    def __init__(self, lattice, flow, derivative=None):
+        super(Enstrophy, self).__init__(lattice, flow)
+        self.derivative = FiniteDifferenceDerivative(order=6) if derivative is None else derivative
+        self.members = _member_observables(Enstrophy, lattice, flow, derivative=self.derivative)
+
     def __call__(self, f):
-        u0 = self.flow.units.convert_velocity_to_pu(self.lattice.u(f)[0])
-        u1 = self.flow.units.convert_velocity_to_pu(self.lattice.u(f)[1])
+        if self.members is not None:
+            return _stack_members(self.members, f)
+        u = self.flow.units.convert_velocity_to_pu(self.lattice.u(f))
         dx = self.flow.units.convert_length_to_pu(1.0)
-        grad_u0 = torch_gradient(u0, dx=dx, order=6)
-        grad_u1 = torch_gradient(u1, dx=dx, order=6)
-        vorticity = pdsum((grad_u0[1] - grad_u1[0]) * (grad_u0[1] - grad_u1[0]))
+        grad_u = self.derivative.velocity_gradient(u, dx=dx)
+        vorticity = pdsum((grad_u[0, 1] - grad_u[1, 0]) * (grad_u[0, 1] - grad_u[1, 0]))
         if self.lattice.D == 3:
-            u2 = self.flow.units.convert_velocity_to_pu(self.lattice.u(f)[2])
-            grad_u2 = torch_gradient(u2, dx=dx, order=6)
             vorticity += pdsum(
-                (grad_u2[1] - grad_u1[2]) * (grad_u2[1] - grad_u1[2])
-                + ((grad_u0[2] - grad_u2[0]) * (grad_u0[2] - grad_u2[0]))
+                (grad_u[2, 1] - grad_u[1, 2]) * (grad_u[2, 1] - grad_u[1, 2])
+                + ((grad_u[0, 2] - grad_u[2, 0]) * (grad_u[0, 2] - grad_u[2, 0]))
             )
         return vorticity * dx ** self.lattice.D
 
 
 class EnergySpectrum(Observable):
-    """The kinetic energy spectrum"""
+    """The kinetic energy spectrum
+
+    The energy of the Fourier modes is summed in shells of unit width around the integer wavenumbers k, i.e.
+    over the wavenumbers in (k - 1/2, k + 1/2]. The shell index of each mode is precomputed, so that a call
+    costs one real FFT and one weighted bincount. Modes of the half spectrum that stand for a conjugate pair
+    are counted twice.
+    For ensembles (see EnsembleFlow), the members are evaluated one after the other; the result has the shape (K, B).
+    """
 
     def __init__(self, lattice, flow):
         super(EnergySpectrum, self).__init__(lattice, flow)
+        self.members = _member_observables(EnergySpectrum, lattice, flow)
+        if self.members is not None:
+            self.wavenumbers = self.members[0].wavenumbers
+            return
         self.dx = self.flow.units.convert_length_to_pu(1.0)
         self.dimensions = self.flow.grid[0].shape
-        frequencies = [self.lattice.convert_to_tensor(np.fft.fftfreq(dim, d=1 / dim)) for dim in self.dimensions]
-        wavenumbers = pdstack(paddle.meshgrid(*frequencies))
-        wavenorms = pdnorm(wavenumbers, dim=0)
+        frequencies = [np.fft.fftfreq(dim, d=1 / dim) for dim in self.dimensions[:-1]]
+        frequencies.append(np.fft.rfftfreq(self.dimensions[-1], d=1 / self.dimensions[-1]))
+        wavenumbers = np.stack(np.meshgrid(*frequencies, indexing="ij"))
+        wavenorms = np.linalg.norm(wavenumbers, axis=0)
 
         if self.lattice.D == 3:
             self.norm = self.dimensions[0] * np.sqrt(2 * np.pi) / self.dx ** 2
         else:
             self.norm = self.dimensions[0] / self.dx
 
-        self.wavenumbers = paddle.arange(int(pdmax(wavenorms)))
-        self.wavemask = (
-                (wavenorms[..., None] > self.wavenumbers.to(dtype=lattice.dtype, device=lattice.device) - 0.5) &
-                (wavenorms[..., None] <= self.wavenumbers.to(dtype=lattice.dtype, device=lattice.device) + 0.5)
+        self.wavenumbers = paddle.arange(int(np.max(wavenorms)))
+        self.shells = paddle.to_tensor(np.ceil(wavenorms - 0.5).astype(np.int64).ravel())
+        # the last axis holds only the non-negative frequencies; all others but 0 and Nyquist have a conjugate twin
+        multiplicity = np.full(wavenorms.shape[-1], 2.0)
+        multiplicity[0] = 1.0
+        if self.dimensions[-1] % 2 == 0:
+            multiplicity[-1] = 1.0
+        self.weights = self.lattice.convert_to_tensor(
+            np.broadcast_to(0.5 * multiplicity / self.norm ** 2, wavenorms.shape).ravel()
         )
 
     def __call__(self, f):
@@ -93,34 +139,13 @@ class EnergySpectrum(Observable):
         return self.spectrum_from_u(u)
 
     def spectrum_from_u(self, u):
+        if self.members is not None:
+            return _stack_members(self.members, u, method="spectrum_from_u")
         u = self.flow.units.convert_velocity_to_pu(u)
-        ekin = self._ekin_spectrum(u)
-        ek = ekin[..., None] * self.wavemask.to(dtype=self.lattice.dtype)
-        ek = ek.sum(paddle.arange(self.lattice.D).tolist())
-        return ek
-
-    def _ekin_spectrum(self, u):
-        """distinguish between different torch versions"""
-        torch_ge_18  = True
-        if torch_ge_18:
-            return self._ekin_spectrum_torch_ge_18(u)
-        else:
-            return self._ekin_spectrum_torch_lt_18(u)
-
-    def _ekin_spectrum_torch_lt_18(self, u):
-        zeros = pdzeros(self.dimensions, dtype=self.lattice.dtype, device=self.lattice.device)[..., None]
-        uh = (pdstack([
-            paddle.fft(paddle.concat((u[i][..., None], zeros), self.lattice.D),
-                      signal_ndim=self.lattice.D) for i in range(self.lattice.D)]) / self.norm)
-        ekin = pdsum(0.5 * (uh[..., 0] ** 2 + uh[..., 1] ** 2), dim=0)
-        return ekin
-
-    def _ekin_spectrum_torch_ge_18(self, u):
-        uh = (pdstack([
-            paddle.fft.fftn(u[i], dim=tuple(paddle.arange(self.lattice.D))) for i in range(self.lattice.D)
-        ]) / self.norm)
-        ekin = pdsum(0.5 * (uh.imag ** 2 + uh.real ** 2), dim=0)
-        return ekin
+        uh = paddle.fft.rfftn(u, axes=list(range(1, self.lattice.D + 1)))
+        ekin = pdsum(paddle.real(uh) ** 2 + paddle.imag(uh) ** 2, dim=0).flatten() * self.weights
+        num_shells = len(self.wavenumbers)
+        return paddle.bincount(self.shells, weights=ekin, minlength=num_shells)[:num_shells]
 
 
 class Mass(Observable):
@@ -131,13 +156,17 @@ class Mass(Observable):
     no_mass_mask : torch.Tensor
         Boolean mask that defines grid points
         which do not count into the total mass (e.g. bounce-back boundaries).
+        For ensembles (see EnsembleFlow), one value per member.
     """
 
     def __init__(self, lattice, flow, no_mass_mask=None):
         super(Mass, self).__init__(lattice, flow)
         self.mask = no_mass_mask
+        self.members = _member_observables(Mass, lattice, flow, no_mass_mask=no_mass_mask)
 
     def __call__(self, f):
+        if self.members is not None:
+            return _stack_members(self.members, f)
         mass = f[..., 1:-1, 1:-1].sum()
         if self.mask is not None:
             mass -= (f * self.mask.to(dtype=paddle.float32)).sum()
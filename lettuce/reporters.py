@@ -38,7 +38,8 @@ def write_vtk(point_dict, id=0, filename_base="./data/output"):
 
 
 class VTKReporter:
-    """General VTK Reporter for velocity and pressure"""
+    """General VTK Reporter for velocity and pressure.
+    For ensembles (see EnsembleFlow), each member b is written to its own files `{filename_base}_member{b}_*`."""
 
     def __init__(self, lattice, flow, interval=50, filename_base="./data/output"):
         self.lattice = lattice
@@ -54,15 +55,22 @@ class VTKReporter:
         if i % self.interval == 0:
             u = self.flow.units.convert_velocity_to_pu(self.lattice.u(f))
             p = self.flow.units.convert_density_lu_to_pressure_pu(self.lattice.rho(f))
-            if self.lattice.D == 2:
-                self.point_dict["p"] = self.lattice.convert_to_numpy(p[0, ..., None])
-                for d in range(self.lattice.D):
-                    self.point_dict[f"u{'xyz'[d]}"] = self.lattice.convert_to_numpy(u[d, ..., None])
+            if hasattr(self.flow, "flows"):
+                for b in range(len(self.flow.flows)):
+                    self._write(u[:, b], p[:, b], i, f"{self.filename_base}_member{b}")
             else:
-                self.point_dict["p"] = self.lattice.convert_to_numpy(p[0, ...])
-                for d in range(self.lattice.D):
-                    self.point_dict[f"u{'xyz'[d]}"] = self.lattice.convert_to_numpy(u[d, ...])
-            write_vtk(self.point_dict, i, self.filename_base)
+                self._write(u, p, i, self.filename_base)
+
+    def _write(self, u, p, i, filename_base):
+        if self.lattice.D == 2:
+            self.point_dict["p"] = self.lattice.convert_to_numpy(p[0, ..., None])
+            for d in range(self.lattice.D):
+                self.point_dict[f"u{'xyz'[d]}"] = self.lattice.convert_to_numpy(u[d, ..., None])
+        else:
+            self.point_dict["p"] = self.lattice.convert_to_numpy(p[0, ...])
+            for d in range(self.lattice.D):
+                self.point_dict[f"u{'xyz'[d]}"] = self.lattice.convert_to_numpy(u[d, ...])
+        write_vtk(self.point_dict, i, filename_base)
 
     def output_mask(self, no_collision_mask):
         """Outputs the no_collision_mask of the simulation object as VTK-file with range [0,1]
@@ -83,7 +91,8 @@ class ErrorReporter:
     """Reports numerical errors with respect to analytic solution."""
 
     def __init__(self, lattice, flow, interval=1, out=sys.stdout):
-        assert hasattr(flow, "analytic_solution")
+        assert hasattr(flow, "analytic_solution"), \
+            f"{flow.__class__.__name__} has no analytic solution (ensembles: add one reporter per member flow)."
         self.lattice = lattice
         self.flow = flow
         self.interval = interval
@@ -124,6 +133,9 @@ class ObservableReporter:
     >>> reporter = ObservableReporter(enstrophy, interval=10)
     >>> # simulation = ...
     >>> # simulation.reporters.append(reporter)
+
+    For ensembles (see EnsembleFlow), the observable carries the member axis last and every call writes
+    one entry [steps, member, time, observed...] per member.
     """
 
     def __init__(self, observable, interval=1, out=sys.stdout):
@@ -131,18 +143,30 @@ class ObservableReporter:
         self.interval = interval
         self.out = [] if out is None else out
         self._parameter_name = observable.__class__.__name__
-        print('steps    ', 'time    ', self._parameter_name)
+        self._ensemble = hasattr(observable.flow, "flows")
+        if self._ensemble:
+            print('steps    ', 'member    ', 'time    ', self._parameter_name)
+        else:
+            print('steps    ', 'time    ', self._parameter_name)
 
     def __call__(self, i, t, f):
         if i % self.interval == 0:
             observed = self.observable.lattice.convert_to_numpy(self.observable(f))
-            assert len(observed.shape) < 2
-            if len(observed.shape) == 0:
-                observed = [observed.item()]
+            if self._ensemble:
+                t = np.broadcast_to(t, observed.shape[-1:])
+                for b in range(observed.shape[-1]):
+                    self._write([i, b, float(t[b])], observed[..., b])
             else:
-                observed = observed.tolist()
-            entry = [i, t] + observed
-            if isinstance(self.out, list):
-                self.out.append(entry)
-            else:
-                print(*entry, file=self.out)
+                self._write([i] + np.atleast_1d(t).tolist(), observed)
+
+    def _write(self, prefix, observed):
+        assert len(observed.shape) < 2
+        if len(observed.shape) == 0:
+            observed = [observed.item()]
+        else:
+            observed = observed.tolist()
+        entry = prefix + observed
+        if isinstance(self.out, list):
+            self.out.append(entry)
+        else:
+            print(*entry, file=self.out)
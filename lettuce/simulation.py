@@ -3,11 +3,12 @@
 
 from timeit import default_timer as timer
 from lettuce import (
-    LettuceException, get_default_moment_transform, BGKInitialization, ExperimentalWarning, torch_gradient
+    LettuceException, get_default_moment_transform, BGKInitialization, ExperimentalWarning, FiniteDifferenceDerivative,
+    MomentCache
 )
-from lettuce.util import pressure_poisson
+from lettuce.util import pressure_poisson, ensemble_parameter
 import pickle
-from copy import deepcopy
+from copy import copy, deepcopy
 import warnings
 import paddle
 import numpy as np
@@ -23,6 +24,11 @@ class Simulation:
     ----------
     reporters : list
         A list of reporters. Their call functions are invoked after every simulation step (and before the first one).
+        In compiled mode (see :meth:`compile`), they are invoked after every call of the compiled graph.
+    moment_cache : lettuce.MomentCache
+        Moments of the current distribution function; filled post-streaming (after the boundaries)
+        and shared by the reporters and the next collision. It is registered as `lattice.moment_cache` whenever
+        the simulation binds its distribution function, so that simulations on a shared lattice take turns.
 
     """
 
@@ -32,6 +38,8 @@ class Simulation:
         self.collision = collision
         self.streaming = streaming
         self.i = 0
+        self.steps_per_call = 1
+        self._compiled_steps = None
 
         grid = flow.grid
         p, u = flow.initial_solution(grid)
@@ -48,6 +56,8 @@ class Simulation:
         self.f = lattice.equilibrium(rho, lattice.convert_to_tensor(u))
 
         self.reporters = []
+        self.moment_cache = MomentCache(lattice)
+        lattice.moment_cache = self.moment_cache
 
         # Define masks, where the collision or streaming are not applied
         x = flow.grid
@@ -55,7 +65,8 @@ class Simulation:
         no_stream_mask = lattice.convert_to_tensor(np.zeros(self.f.shape, dtype=bool))
 
         # Apply boundaries
-        self._boundaries = deepcopy(self.flow.boundaries)  # store locally to keep the flow free from the boundary state
+        # store locally to keep the flow free from the boundary state; the lattice (and its moment cache) is shared
+        self._boundaries = deepcopy(self.flow.boundaries, {id(lattice): lattice})
         for boundary in self._boundaries:
             if hasattr(boundary, "make_no_collision_mask"):
                 self.no_collision_mask = self.no_collision_mask | boundary.make_no_collision_mask(self.f.shape)
@@ -67,15 +78,21 @@ class Simulation:
     def step(self, num_steps):
         """Take num_steps stream-and-collision steps and return performance in MLUPS."""
         start = timer()
+        self._bind_moments()
         if self.i == 0:
             self._report()
-        for _ in range(num_steps):
-            # Perform the collision routine everywhere, expect where the no_collision_mask is true
-            self.f = paddle.where(self.no_collision_mask, self.f, self.collision(self.f))
-            self.f = self.streaming(self.f)
-            for boundary in self._boundaries:
-                self.f = boundary(self.f)
+        num_eager_steps = num_steps
+        if self._compiled_steps is not None:
+            for _ in range(num_steps // self.steps_per_call):
+                self.f = self._run_compiled_steps(self.f)
+                self.i += self.steps_per_call
+                self._bind_moments()
+                self._report()
+            num_eager_steps = num_steps % self.steps_per_call
+        for _ in range(num_eager_steps):
+            self.f = self._collide_and_stream(self.f)
             self.i += 1
+            self._bind_moments()
             self._report()
         end = timer()
         seconds = end - start
@@ -83,6 +100,62 @@ class Simulation:
         mlups = num_steps * num_grid_points / 1e6 / seconds
         return mlups
 
+    def _collide_and_stream(self, f):
+        # Perform the collision routine everywhere, expect where the no_collision_mask is true;
+        # the post-collision populations are kept in place and streamed in place
+        f = paddle.where_(self.no_collision_mask.logical_not(), self.collision(f), f)
+        f = self.streaming(f)
+        for boundary in self._boundaries:
+            f = boundary(f)
+        return f
+
+    def compile(self, steps_per_call=1, **kwargs):
+        """Capture collision, streaming and boundaries of `steps_per_call` steps as one static graph.
+
+        Subsequent calls of :meth:`step` run the compiled graph and only return to Python (and the reporters)
+        every `steps_per_call` steps; remaining steps are taken eagerly. Keyword arguments are passed on to
+        `paddle.jit.to_static`; by default, the graph is captured by bytecode translation (`full_graph=False`).
+        The graph is traced on its first call, so exclude that call from timings. Before, one step is taken
+        on copies to fill the Python-side caches (e.g. einsum plans), and the moment cache is detached from the
+        lattice while the graph runs, so that neither is part of the captured code.
+
+        Python scalars (e.g. relaxation times and weights) enter the graph as single-precision attributes,
+        so in float64, compiled steps agree with eager steps to about 1e-8 (relative) only.
+        """
+        if steps_per_call < 1:
+            raise LettuceException(f"steps_per_call has to be positive, but got {steps_per_call}.")
+        self.steps_per_call = steps_per_call
+        self._build_plans()
+        kwargs.setdefault("full_graph", False)
+        if kwargs["full_graph"]:
+            kwargs.setdefault("input_spec", [paddle.static.InputSpec(shape=self.f.shape, dtype=self.f.dtype)])
+        self._compiled_steps = paddle.jit.to_static(_FusedSteps(self), **kwargs)
+        return self
+
+    def _run_compiled_steps(self, f):
+        moment_cache, self.lattice.moment_cache = self.lattice.moment_cache, None
+        try:
+            return self._compiled_steps(f)
+        finally:
+            self.lattice.moment_cache = moment_cache
+
+    def _build_plans(self):
+        """Take one step on copies of f and of the stateful parts, which fills the Python-side caches
+        (e.g. the einsum plans of the lattice); graph capture can not translate their construction."""
+        twin = copy(self)
+        twin.collision, twin.streaming, twin._boundaries = deepcopy(
+            (self.collision, self.streaming, self._boundaries), {id(self.lattice): self.lattice}
+        )
+        moment_cache, self.lattice.moment_cache = self.lattice.moment_cache, None
+        try:
+            twin._collide_and_stream(self.f.clone())
+        finally:
+            self.lattice.moment_cache = moment_cache
+
+    def _bind_moments(self):
+        self.lattice.moment_cache = self.moment_cache
+        self.moment_cache.bind(self.f)
+
     def _report(self):
         for reporter in self.reporters:
             reporter(self.i, self.flow.units.convert_time_to_pu(self.i), self.f)
@@ -98,6 +171,7 @@ class Simulation:
         transform = get_default_moment_transform(self.lattice)
         collision = BGKInitialization(self.lattice, self.flow, transform)
         streaming = self.streaming
+        self.moment_cache.invalidate()
         p_old = 0
         for i in range(max_num_steps):
             self.f = streaming(self.f)
@@ -108,38 +182,53 @@ class Simulation:
             p_old = deepcopy(p)
         return i
 
-    def initialize_pressure(self, max_num_steps=100000, tol_pressure=1e-6):
-        """Reinitialize equilibrium distributions with pressure obtained by a Jacobi solver.
+    def initialize_pressure(self, max_num_steps=100000, tol_pressure=1e-6, derivative=None, solver="fft"):
+        """Reinitialize equilibrium distributions with pressure obtained by a Poisson solver
+        (by default, a direct FFT solve; see :func:`lettuce.util.pressure_poisson` for `derivative` and `solver`).
         Note that this method has to be called before initialize_f_neq.
+        For ensembles (see :class:`lettuce.EnsembleFlow`), the pressure of each member is solved for separately.
         """
         u = self.lattice.u(self.f)
-        rho = pressure_poisson(
-            self.flow.units,
-            self.lattice.u(self.f),
-            self.lattice.rho(self.f),
-            tol_abs=tol_pressure,
-            max_num_steps=max_num_steps
-        )
+        rho = self.lattice.rho(self.f)
+
+        def solve(units, u, rho):
+            return pressure_poisson(
+                units,
+                u,
+                rho,
+                tol_abs=tol_pressure,
+                max_num_steps=max_num_steps,
+                derivative=derivative,
+                solver=solver
+            )
+
+        members = getattr(self.flow.units, "members", None)
+        if members is None:
+            rho = solve(self.flow.units, u, rho)
+        else:
+            rho = paddle.stack([solve(units, u[:, b], rho[:, b]) for b, units in enumerate(members)], axis=1)
         self.f = self.lattice.equilibrium(rho, u)
 
-    def initialize_f_neq(self):
-        """Initialize the distribution function values. The f^(1) contributions are approximated by finite differences.
+    def initialize_f_neq(self, derivative=None):
+        """Initialize the distribution function values. The f^(1) contributions are approximated by finite differences
+        (or by the given `derivative` backend, e.g. :class:`lettuce.SpectralDerivative` on periodic domains).
         See Krüger et al. (2017).
         """
         rho = self.lattice.rho(self.f)
         u = self.lattice.u(self.f)
 
-        grad_u0 = torch_gradient(u[0], dx=1, order=6)[None, ...]
-        grad_u1 = torch_gradient(u[1], dx=1, order=6)[None, ...]
-        S = paddle.concat([grad_u0, grad_u1])
+        derivative = FiniteDifferenceDerivative(order=6) if derivative is None else derivative
+        members = getattr(self.flow.units, "members", None)
+        if members is None:
+            S = derivative.velocity_gradient(u, dx=1)
+        else:
+            # the derivative backends act on one grid; the member axis of an ensemble follows the two tensor axes
+            S = paddle.stack([derivative.velocity_gradient(u[:, b], dx=1) for b in range(len(members))], axis=2)
 
-        if self.lattice.D == 3:
-            grad_u2 = torch_gradient(u[2], dx=1, order=6)[None, ...]
-            S = paddle.concat([S, grad_u2])
-
-        Pi_1 = 1.0 * self.flow.units.relaxation_parameter_lu * rho * S / self.lattice.cs ** 2
-        Q = (paddle.einsum('ia,ib->iab', [self.lattice.e, self.lattice.e])
-             - paddle.eye(self.lattice.D, device=self.lattice.device, dtype=self.lattice.dtype) * self.lattice.cs ** 2)
+        tau = ensemble_parameter(self.lattice, self.flow.units.relaxation_parameter_lu)
+        Pi_1 = 1.0 * tau * rho * S / self.lattice.cs ** 2
+        Q = (self.lattice.einsum('ia,ib->iab', [self.lattice.e, self.lattice.e])
+             - self.lattice.convert_to_tensor(np.eye(self.lattice.D)) * self.lattice.cs ** 2)
         Pi_1_Q = self.lattice.einsum('ab,iab->i', [Pi_1, Q])
         fneq = self.lattice.einsum('i,i->i', [self.lattice.w, Pi_1_Q])
 
@@ -156,3 +245,15 @@ class Simulation:
         with open(filename, "rb") as fp:
             self.f = pickle.load(fp)
 
+
+class _FusedSteps(paddle.nn.Layer):
+    """`steps_per_call` steps of a simulation as a layer, so that `paddle.jit.to_static` captures them as one graph."""
+
+    def __init__(self, simulation):
+        super().__init__()
+        self.simulation = simulation
+
+    def forward(self, f):
+        for _ in range(self.simulation.steps_per_call):
+            f = self.simulation._collide_and_stream(f)
+        return f
@@ -0,0 +1,69 @@
+"""
+Simulations on the fluid nodes of mostly solid geometries.
+"""
+
+import warnings
+
+import numpy as np
+
+from lettuce.util import LettuceException, _is_field
+from lettuce.boundary import BounceBackBoundary, HalfwayBounceBackBoundary
+from lettuce.streaming import SparseStreaming
+from lettuce.simulation import Simulation
+
+__all__ = ["SparseSimulation"]
+
+
+class SparseSimulation(Simulation):
+    """Simulation that stores, collides and streams the fluid nodes only.
+
+    The solid nodes are given by the masks of the bounce-back boundaries (e.g. `Obstacle.mask`) and are resolved
+    in the neighbor table of :class:`SparseStreaming` as halfway bounce-back. The distribution function `f`
+    has the shape (Q, N_fluid); :meth:`dense` scatters it back to the grid.
+    Reporters receive the dense distribution function, which is only assembled in steps in which at least
+    one reporter is due according to its `interval`.
+
+    Other boundaries are supported if they are defined by fields on the grid (e.g. :class:`EquilibriumBoundaryPU`);
+    these fields are cut to the fluid nodes. Boundaries on a side of the domain (outlets) are not supported.
+    The collision has to act node-wise.
+
+    A fullway :class:`BounceBackBoundary` is resolved as halfway bounce-back as well, which returns the populations
+    one step earlier; a warning is issued in this case.
+    """
+
+    def __init__(self, flow, lattice, collision):
+        solid = np.zeros(np.shape(flow.grid[0]), dtype=bool)
+        for boundary in flow.boundaries:
+            if isinstance(boundary, (BounceBackBoundary, HalfwayBounceBackBoundary)):
+                if isinstance(boundary, BounceBackBoundary):
+                    warnings.warn(
+                        "SparseSimulation resolves the fullway BounceBackBoundary as halfway bounce-back. "
+                        "Use HalfwayBounceBackBoundary to silence this warning."
+                    )
+                solid |= lattice.convert_to_numpy(boundary.mask).astype(bool)
+            elif getattr(boundary, "index", None) is not None:
+                raise LettuceException(f"{boundary.__class__.__name__} is not supported by SparseSimulation.")
+        super().__init__(flow, lattice, collision, SparseStreaming(lattice, ~solid))
+        self._boundaries = [
+            boundary for boundary in self._boundaries
+            if not isinstance(boundary, (BounceBackBoundary, HalfwayBounceBackBoundary))
+        ]
+        for boundary in self._boundaries:
+            for name, value in vars(boundary).items():
+                if _is_field(value, self.streaming.shape):
+                    setattr(boundary, name, self.streaming.sparse(value))
+        self.f = self.streaming.sparse(self.f)
+        self.no_collision_mask = self.streaming.sparse(self.no_collision_mask)
+
+    def dense(self, f=None):
+        """Distribution function on the full grid; the solid nodes are at rest with unit density."""
+        f = self.f if f is None else f
+        return self.streaming.dense(f, fill=self.lattice.w)
+
+    def _report(self):
+        due = [reporter for reporter in self.reporters if self.i % getattr(reporter, "interval", 1) == 0]
+        if not due:
+            return
+        f = self.dense()
+        for reporter in due:
+            reporter(self.i, self.flow.units.convert_time_to_pu(self.i), f)
@@ -5,9 +5,10 @@ Streaming Step
 
 import paddle
 import numpy as np
+from lettuce.util import LettuceException
 from lettuce.utils import pdroll
 
-__all__ = ["StandardStreaming"]
+__all__ = ["StandardStreaming", "GatherStreaming", "SparseStreaming"]
 
 
 class StandardStreaming:
@@ -23,6 +24,9 @@ class StandardStreaming:
     def __init__(self, lattice):
         self.lattice = lattice
         self._no_stream_mask = None
+        # shifts as plain Python ints, which graph capture (paddle.jit.to_static) can pass on to paddle.roll
+        self._shifts = lattice.stencil.e.tolist()
+        self._dims = list(range(-lattice.D, 0))
 
     @property
     def no_stream_mask(self):
@@ -42,7 +46,127 @@ class StandardStreaming:
         return f
 
     def _stream(self, f, i):
-        return pdroll(f[i], shifts=tuple(self.lattice.stencil.e[i]), dims=tuple(np.arange(self.lattice.D)))
+        return pdroll(f[i], shifts=self._shifts[i], dims=self._dims)
+
+
+class GatherStreaming:
+    """Pull streaming as a single gather over precomputed neighbor indices.
+
+    For each population i and node x, the index table holds the flat index of the node x - e_i
+    (with periodic wrap). Streaming is then one `take_along_axis` on the (Q, N) view of f
+    instead of Q-1 rolls. Populations in the no-stream mask map to their own node,
+    so the mask costs nothing at runtime.
+
+    Attributes
+    ----------
+    no_stream_mask : torch.Tensor
+        Boolean mask with the same shape as the distribution function f.
+        If None, stream all (also around all boundaries).
+    """
+
+    def __init__(self, lattice, shape=None):
+        self.lattice = lattice
+        self._no_stream_mask = None
+        self._shape = None
+        self._index = None
+        if shape is not None:
+            self._build_index(tuple(shape))
+
+    @property
+    def no_stream_mask(self):
+        return self._no_stream_mask
+
+    @no_stream_mask.setter
+    def no_stream_mask(self, mask):
+        self._no_stream_mask = mask
+        if mask is not None:
+            self._build_index(tuple(mask.shape[1:]))
+        elif self._shape is not None:
+            self._build_index(self._shape)
+
+    def _build_index(self, shape):
+        num_nodes = int(np.prod(shape))
+        nodes = np.arange(num_nodes, dtype=np.int64).reshape(shape)
+        dims = tuple(np.arange(-self.lattice.D, 0))
+        index = np.stack([np.roll(nodes, shift=tuple(e), axis=dims) for e in self.lattice.stencil.e])
+        if self.no_stream_mask is not None:
+            index = np.where(self.lattice.convert_to_numpy(self.no_stream_mask), nodes[None, ...], index)
+        dtype = paddle.int32 if num_nodes < np.iinfo(np.int32).max else paddle.int64
+        self._shape = shape
+        self._index = paddle.to_tensor(index.reshape(self.lattice.Q, num_nodes), dtype=dtype)
+
+    def __call__(self, f):
+        if self._shape != tuple(f.shape[1:]):
+            self._build_index(tuple(f.shape[1:]))
+        f_flat = f.reshape([self.lattice.Q, -1])
+        return paddle.take_along_axis(f_flat, self._index, axis=1).reshape(f.shape)
+
+
+class SparseStreaming:
+    """Streaming on the fluid nodes only, for geometries that are mostly solid (porous media, obstacle arrays).
+
+    The distribution function has the shape (Q, N_fluid). Streaming is one gather over a precomputed
+    neighbor table with periodic wrap, in which populations that would come from a solid node
+    are bounced back at the fluid node (halfway bounce-back).
+    Use :meth:`sparse` and :meth:`dense` to convert fields between the grid and the fluid nodes.
+
+    Parameters
+    ----------
+    fluid_mask : np.array with dtype = bool
+        True on the fluid nodes; the shape is the shape of the grid.
+    """
+
+    def __init__(self, lattice, fluid_mask):
+        self.lattice = lattice
+        fluid_mask = np.asarray(fluid_mask, dtype=bool)
+        self.shape = fluid_mask.shape
+        nodes = np.flatnonzero(fluid_mask)
+        num_fluid = len(nodes)
+        fluid_id = np.full(fluid_mask.size, -1, dtype=np.int64)
+        fluid_id[nodes] = np.arange(num_fluid)
+        fluid_id = fluid_id.reshape(self.shape)
+        dims = tuple(range(fluid_mask.ndim))
+        index = []
+        for i, e in enumerate(lattice.stencil.e):
+            # fluid id of the node x - e_i, from which population i streams into x
+            source = np.roll(fluid_id, shift=tuple(e), axis=dims)[fluid_mask]
+            bounced = lattice.stencil.opposite[i] * num_fluid + np.arange(num_fluid)
+            index.append(np.where(source >= 0, i * num_fluid + source, bounced))
+        self._nodes_numpy = nodes
+        self._nodes = paddle.to_tensor(nodes)
+        self._index = paddle.to_tensor(np.concatenate(index))
+
+    @property
+    def no_stream_mask(self):
+        return None
+
+    @no_stream_mask.setter
+    def no_stream_mask(self, mask):
+        raise LettuceException("SparseStreaming does not support no-stream masks.")
+
+    def __call__(self, f):
+        return paddle.gather(f.flatten(), self._index).reshape(f.shape)
+
+    def sparse(self, field):
+        """Values of a field with shape (..., *grid) on the fluid nodes, with shape (..., N_fluid)."""
+        leading = list(field.shape[:len(field.shape) - len(self.shape)])
+        if isinstance(field, np.ndarray):
+            return field.reshape(leading + [-1])[..., self._nodes_numpy]
+        if field.dtype == paddle.bool:
+            return self.sparse(field.astype("int32")).astype("bool")
+        return paddle.index_select(field.reshape(leading + [-1]), self._nodes, axis=len(leading))
+
+    def dense(self, field, fill=None):
+        """Scatter a field with shape (..., N_fluid) to the grid (..., *grid).
+
+        The solid nodes get `fill`, which has the shape of the leading dimensions (default: 0)."""
+        leading = list(field.shape[:-1])
+        num_nodes = int(np.prod(self.shape))
+        fill = paddle.zeros(leading, dtype=field.dtype) if fill is None else fill
+        out = paddle.expand(fill.reshape(leading + [1]), leading + [num_nodes]).flatten()
+        offsets = paddle.arange(int(np.prod(leading)), dtype=self._nodes.dtype) * num_nodes
+        index = (offsets[:, None] + self._nodes[None, :]).flatten()
+        return paddle.scatter(out, index, field.flatten()).reshape(leading + list(self.shape))
 
 
 class SLStreaming:
@@ -0,0 +1,127 @@
+"""
+Cache-blocked execution of the simulation step on a thread pool.
+"""
+
+import os
+import itertools
+from copy import deepcopy
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import paddle
+
+from lettuce.util import LettuceException, _check_cut, _cut_fields, _take
+from lettuce.simulation import Simulation
+
+__all__ = ["TiledSimulation"]
+
+
+class TiledSimulation(Simulation):
+    """Simulation that collides and streams the grid tile by tile on a thread pool.
+
+    For each tile, a thread gathers the tile together with ghost layers on each side (wrapped periodically)
+    from the pre-collision distribution, collides and streams it, applies the boundaries to its own nodes,
+    and keeps the interior. The ghost nodes are collided redundantly, so that the tiles are independent
+    and the result is identical to :class:`Simulation`. Tiles that fit into the cache avoid sweeping
+    the full Q x grid array through memory in every stage of the step.
+
+    Masks and tensor attributes of boundaries (e.g. `mask`) are cut to the tiles, those of the collision's
+    force (e.g. an acceleration field) to the tiles with their ghost layers. Outlets have to lie on a side of
+    the domain that is not tiled. The collision has to act node-wise.
+
+    Parameters
+    ----------
+    tile_shape : tuple
+        Number of nodes of a tile along each spatial axis; None keeps the axis whole.
+    num_threads : int
+        Size of the thread pool; defaults to the number of cores.
+    """
+
+    def __init__(self, flow, lattice, collision, streaming, tile_shape, num_threads=None):
+        super().__init__(flow, lattice, collision, streaming)
+        if len(tile_shape) != lattice.D:
+            raise LettuceException(f"Expected a tile shape of length {lattice.D}, but got {tile_shape}.")
+        grid_shape = self.f.shape[-lattice.D:]
+        # per axis: list of (start, stop) ranges, or None if the axis is not tiled
+        ranges = []
+        for size, tile_size in zip(grid_shape, tile_shape):
+            if tile_size is None or tile_size >= size:
+                ranges.append([None])
+            elif tile_size < 1:
+                raise LettuceException(f"Invalid tile shape {tile_shape}.")
+            else:
+                ranges.append([(start, min(start + tile_size, size)) for start in range(0, size, tile_size)])
+        _check_cut(self._boundaries, collision, [d for d in range(lattice.D) if ranges[d] != [None]], "tiling")
+        self.tile_shape = tuple(tile_shape)
+        self.num_threads = os.cpu_count() if num_threads is None else num_threads
+        self._num_tiles = [len(r) for r in ranges]
+        self._tiles = [_Tile(self, tile_ranges) for tile_ranges in itertools.product(*ranges)]
+        self._pool = ThreadPoolExecutor(self.num_threads)
+
+    def compile(self, steps_per_call=1, **kwargs):
+        raise LettuceException("TiledSimulation can not be compiled.")
+
+    def close(self):
+        """Shut down the thread pool."""
+        self._pool.shutdown()
+
+    def _collide_and_stream(self, f):
+        blocks = list(self._pool.map(lambda tile: tile(f), self._tiles))
+        self.moment_cache.invalidate()
+        # tiles are in row-major order; join them along the last axis first
+        for d in reversed(range(self.lattice.D)):
+            n = self._num_tiles[d]
+            if n > 1:
+                axis = d - self.lattice.D
+                blocks = [paddle.concat(blocks[k:k + n], axis=axis) for k in range(0, len(blocks), n)]
+        return blocks[0]
+
+
+class _Tile:
+    """Collision, streaming and boundaries of one tile of a TiledSimulation."""
+
+    def __init__(self, simulation, ranges):
+        lattice = simulation.lattice
+        grid_shape = simulation.f.shape[-lattice.D:]
+        self.lattice = lattice
+        self.padded = []
+        self.interior = [Ellipsis]
+        own = []
+        for d, (size, r) in enumerate(zip(grid_shape, ranges)):
+            axis = d - lattice.D
+            if r is None:
+                self.interior.append(slice(None))
+                continue
+            start, stop = r
+            halo = int(np.abs(lattice.stencil.e[:, d]).max())
+            own.append((axis, np.arange(start, stop)))
+            self.padded.append((axis, np.arange(start - halo, stop + halo) % size))
+            self.interior.append(slice(halo, halo + stop - start))
+        self.interior = tuple(self.interior)
+
+        self.boundaries = deepcopy(simulation._boundaries, {id(lattice): lattice})
+        for boundary in self.boundaries:
+            _cut_fields(boundary, grid_shape, own)
+        self.collision = deepcopy(simulation.collision, {id(lattice): lattice})
+        if getattr(self.collision, "force", None) is not None:
+            _cut_fields(self.collision.force, grid_shape, self.padded)
+        self.streaming = deepcopy(simulation.streaming, {id(lattice): lattice})
+        no_stream_mask = simulation.streaming.no_stream_mask
+        no_collision_mask = simulation.no_collision_mask
+        for axis, index in self.padded:
+            no_collision_mask = _take(no_collision_mask, index, axis)
+            if no_stream_mask is not None:
+                no_stream_mask = _take(no_stream_mask, index, axis)
+        if no_stream_mask is not None:
+            self.streaming.no_stream_mask = no_stream_mask
+        self.no_collision_mask = no_collision_mask
+        self.padded = [(axis, paddle.to_tensor(index)) for axis, index in self.padded]
+
+    def __call__(self, f):
+        for axis, index in self.padded:
+            f = paddle.index_select(f, index, axis=axis % len(f.shape))
+        f = paddle.where_(self.no_collision_mask.logical_not(), self.collision(f), f)
+        f = self.streaming(f)[self.interior]
+        for boundary in self.boundaries:
+            f = boundary(f)
+        return f
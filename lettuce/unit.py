@@ -8,7 +8,7 @@ pu = physical units
 import numpy as np
 import paddle
 
-__all__ = ["UnitConversion"]
+__all__ = ["UnitConversion", "EnsembleUnitConversion"]
 
 
 class UnitConversion:
@@ -124,3 +124,44 @@ class UnitConversion:
         """Energy in incompressible systems is defined in units of [velocity**2]"""
         return energy_pu * (self.characteristic_velocity_lu ** 2) / (self.characteristic_velocity_pu ** 2)
 
+
+
+class EnsembleUnitConversion:
+    """
+    Unit conversion for an ensemble of simulations that run in one distribution tensor.
+    Every member has its own :class:`UnitConversion`. Fields carry the member axis in front of the grid axes,
+    i.e. (..., B, *grid); reduced quantities carry it last, i.e. (..., B).
+    Scalars are converted for each member, which yields one value per member.
+    Properties return numpy arrays of the members' values.
+    """
+
+    def __init__(self, members):
+        self.members = list(members)
+        self.lattice = self.members[0].lattice
+
+    def __len__(self):
+        return len(self.members)
+
+    def __getattr__(self, name):
+        if name.startswith("convert_"):
+            return lambda value: self._convert(name, value)
+        if name.startswith("_") or name == "members":
+            raise AttributeError(name)
+        return np.array([getattr(units, name) for units in self.members])
+
+    def _convert(self, name, value):
+        grid_axes = self.lattice.D
+        if np.ndim(value) > grid_axes:
+            axis = -grid_axes - 1
+        elif np.ndim(value) > 0 and value.shape[-1] == len(self):
+            axis = -1
+        else:
+            return np.array([getattr(units, name)(value) for units in self.members])
+        index = [slice(None)] * np.ndim(value)
+        converted = []
+        for b, units in enumerate(self.members):
+            index[axis] = b
+            converted.append(getattr(units, name)(value[tuple(index)]))
+        if isinstance(value, paddle.Tensor):
+            return paddle.stack(converted, axis=axis)
+        return np.stack(converted, axis=axis)
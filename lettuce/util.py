@@ -4,13 +4,15 @@ Utility functions.
 """
 
 import inspect
+import numpy as np
 import paddle
-from lettuce.utils import pdtensor,pdmean
+from lettuce.utils import pdtensor,pdmean,pdroll
 
 __all__ = [
     "LettuceException", "LettuceWarning", "InefficientCodeWarning", "ExperimentalWarning",
-    "get_subclasses", "torch_gradient", "torch_jacobi", "grid_fine_to_coarse", "pressure_poisson",
-    "append_axes"
+    "get_subclasses", "torch_gradient", "FiniteDifferenceDerivative", "SpectralDerivative", "torch_jacobi", "torch_conjugate_gradient", "fft_poisson",
+    "grid_fine_to_coarse", "pressure_poisson",
+    "append_axes", "ensemble_parameter"
 ]
 
 
@@ -89,16 +91,111 @@ def torch_gradient(f, dx=1, order=2):
         out = paddle.concat(dim * [f[None, ...]])
         for i in range(dim):
             out[i, ...] = (
-                                  weight[0] * f.roll(shifts=shift[i][0], dims=dims) +
-                                  weight[1] * f.roll(shifts=shift[i][1], dims=dims) +
-                                  weight[2] * f.roll(shifts=shift[i][2], dims=dims) +
-                                  weight[3] * f.roll(shifts=shift[i][3], dims=dims) +
-                                  weight[4] * f.roll(shifts=shift[i][4], dims=dims) +
-                                  weight[5] * f.roll(shifts=shift[i][5], dims=dims)
-                          ) * pdtensor(1.0 / dx, dtype=f.dtype, device=f.device)
+                                  weight[0] * pdroll(f, shifts=shift[i][0], dims=dims) +
+                                  weight[1] * pdroll(f, shifts=shift[i][1], dims=dims) +
+                                  weight[2] * pdroll(f, shifts=shift[i][2], dims=dims) +
+                                  weight[3] * pdroll(f, shifts=shift[i][3], dims=dims) +
+                                  weight[4] * pdroll(f, shifts=shift[i][4], dims=dims) +
+                                  weight[5] * pdroll(f, shifts=shift[i][5], dims=dims)
+                          ) * pdtensor(1.0 / dx, dtype=f.dtype)
     return out
 
 
+class FiniteDifferenceDerivative:
+    """Derivatives of periodic fields by central finite differences of the given order (see :func:`torch_gradient`).
+
+    Derivative backends provide `gradient(f, dx)`, which returns the D partial derivatives of a scalar field,
+    `velocity_gradient(u, dx)`, which returns du_a/dx_b with shape (D, D, *grid), `divergence(u, dx)`,
+    and `curl(u, dx)`, which is a scalar field in 2D and has shape (3, *grid) in 3D.
+    """
+
+    def __init__(self, order=6):
+        self.order = order
+
+    def gradient(self, f, dx=1):
+        return torch_gradient(f, dx=dx, order=self.order)
+
+    def velocity_gradient(self, u, dx=1):
+        return paddle.stack([self.gradient(u[a], dx) for a in range(u.shape[0])])
+
+    def divergence(self, u, dx=1):
+        return sum(self.gradient(u[a], dx)[a] for a in range(u.shape[0]))
+
+    def curl(self, u, dx=1):
+        grad_u = self.velocity_gradient(u, dx)
+        return _curl(lambda a, b: grad_u[a, b], u.shape[0])
+
+
+class SpectralDerivative:
+    """Derivatives of periodic fields by real FFTs; see :class:`FiniteDifferenceDerivative` for the interface.
+
+    The velocity gradient takes D forward and D^2 inverse transforms (each batched into one call)
+    instead of D^2 sums of rolled copies; the divergence needs one inverse transform, and the curl one (2D)
+    or three (3D). The wavenumber tensors i k are cached per grid shape, dx, and dtype.
+    The Nyquist modes of first derivatives are set to zero.
+    The method is spectrally accurate for smooth periodic flows, e.g. TaylorGreenVortex2D/3D,
+    DoublyPeriodicShear2D, or DecayingTurbulence.
+    """
+
+    def __init__(self):
+        self._wavenumbers = {}
+
+    def wavenumbers(self, shape, dx, dtype):
+        """i k_d for each axis d, shaped to broadcast against the real FFT of a field with the given grid shape"""
+        key = (tuple(shape), dx, dtype)
+        if key not in self._wavenumbers:
+            complex_dtype = np.complex128 if dtype == paddle.float64 else np.complex64
+            ik = []
+            for d, n in enumerate(shape):
+                last = d == len(shape) - 1
+                k = 2 * np.pi * (np.fft.rfftfreq(n, d=dx) if last else np.fft.fftfreq(n, d=dx))
+                if n % 2 == 0:
+                    k[n // 2] = 0
+                broadcast = [1] * len(shape)
+                broadcast[d] = len(k)
+                ik.append(paddle.to_tensor((1j * k).reshape(broadcast).astype(complex_dtype)))
+            self._wavenumbers[key] = ik
+        return self._wavenumbers[key]
+
+    def gradient(self, f, dx=1):
+        shape = f.shape
+        axes = list(range(len(shape)))
+        fh = paddle.fft.rfftn(f, axes=axes)
+        ik = self.wavenumbers(shape, dx, f.dtype)
+        derivatives = paddle.stack([fh * ik[d] for d in range(len(shape))])
+        return paddle.fft.irfftn(derivatives, s=shape, axes=[d + 1 for d in axes])
+
+    def velocity_gradient(self, u, dx=1):
+        shape = u.shape[1:]
+        axes = list(range(1, len(shape) + 1))
+        uh = paddle.fft.rfftn(u, axes=axes)
+        ik = paddle.stack([k.expand(uh.shape[1:]) for k in self.wavenumbers(shape, dx, u.dtype)])
+        return paddle.fft.irfftn(uh[:, None] * ik[None], s=shape, axes=[d + 1 for d in axes])
+
+    def divergence(self, u, dx=1):
+        shape = u.shape[1:]
+        uh = paddle.fft.rfftn(u, axes=list(range(1, len(shape) + 1)))
+        ik = self.wavenumbers(shape, dx, u.dtype)
+        return paddle.fft.irfftn(sum(uh[a] * ik[a] for a in range(len(shape))), s=shape)
+
+    def curl(self, u, dx=1):
+        shape = u.shape[1:]
+        axes = list(range(1, len(shape) + 1))
+        uh = paddle.fft.rfftn(u, axes=axes)
+        ik = self.wavenumbers(shape, dx, u.dtype)
+        curl_h = _curl(lambda a, b: uh[a] * ik[b], len(shape))
+        if len(shape) == 2:
+            return paddle.fft.irfftn(curl_h, s=shape)
+        return paddle.fft.irfftn(curl_h, s=shape, axes=axes)
+
+
+def _curl(grad_u, dim):
+    """Curl from a function that returns du_a/dx_b (or its transform) for the components a, b."""
+    if dim == 2:
+        return grad_u(1, 0) - grad_u(0, 1)
+    return paddle.stack([grad_u(2, 1) - grad_u(1, 2), grad_u(0, 2) - grad_u(2, 0), grad_u(1, 0) - grad_u(0, 1)])
+
+
 def grid_fine_to_coarse(lattice, f_fine, tau_fine, tau_coarse):
     if f_fine.shape.__len__() == 3:
         f_eq = lattice.equilibrium(lattice.rho(f_fine[:, ::2, ::2]), lattice.u(f_fine[:, ::2, ::2]))
@@ -121,38 +218,104 @@ def torch_jacobi(f, p, dx, device, dim, tol_abs=1e-10, max_num_steps=100000):
         it += 1
         if dim == 2:
             # Difference quotient for second derivative O(h²) for index i=0,1
-            p = (f * (dx ** 2) - (p.roll(shifts=1, dims=0)
-                                  + p.roll(shifts=1, dims=1)
-                                  + p.roll(shifts=-1, dims=0)
-                                  + p.roll(shifts=-1, dims=1))) * -1 / 4
-            residuum = f - (p.roll(shifts=1, dims=0)
-                            + p.roll(shifts=1, dims=1)
-                            + p.roll(shifts=-1, dims=0)
-                            + p.roll(shifts=-1, dims=1)
+            p = (f * (dx ** 2) - (pdroll(p, shifts=1, dims=0)
+                                  + pdroll(p, shifts=1, dims=1)
+                                  + pdroll(p, shifts=-1, dims=0)
+                                  + pdroll(p, shifts=-1, dims=1))) * -1 / 4
+            residuum = f - (pdroll(p, shifts=1, dims=0)
+                            + pdroll(p, shifts=1, dims=1)
+                            + pdroll(p, shifts=-1, dims=0)
+                            + pdroll(p, shifts=-1, dims=1)
                             - 4 * p) / (dx ** 2)
         if dim == 3:
             # Difference quotient for second derivative O(h²) for index i=0,1,2
-            p = (f * (dx ** 2) - (p.roll(shifts=1, dims=0)
-                                  + p.roll(shifts=1, dims=1)
-                                  + p.roll(shifts=1, dims=2)
-                                  + p.roll(shifts=-1, dims=0)
-                                  + p.roll(shifts=-1, dims=1)
-                                  + p.roll(shifts=-1, dims=2))) * -1 / 6
-            residuum = f - (p.roll(shifts=1, dims=0)
-                            + p.roll(shifts=1, dims=1)
-                            + p.roll(shifts=1, dims=2)
-                            + p.roll(shifts=-1, dims=0)
-                            + p.roll(shifts=-1, dims=1)
-                            + p.roll(shifts=-1, dims=2)
+            p = (f * (dx ** 2) - (pdroll(p, shifts=1, dims=0)
+                                  + pdroll(p, shifts=1, dims=1)
+                                  + pdroll(p, shifts=1, dims=2)
+                                  + pdroll(p, shifts=-1, dims=0)
+                                  + pdroll(p, shifts=-1, dims=1)
+                                  + pdroll(p, shifts=-1, dims=2))) * -1 / 6
+            residuum = f - (pdroll(p, shifts=1, dims=0)
+                            + pdroll(p, shifts=1, dims=1)
+                            + pdroll(p, shifts=1, dims=2)
+                            + pdroll(p, shifts=-1, dims=0)
+                            + pdroll(p, shifts=-1, dims=1)
+                            + pdroll(p, shifts=-1, dims=2)
                             - 6 * p) / (dx ** 2)
         # Error is defined as the mean value of the residuum
         error = pdmean(residuum ** 2)
     return p
 
 
-def pressure_poisson(units, u, rho0, tol_abs=1e-10, max_num_steps=100000):
+def torch_conjugate_gradient(f, p, dx, dim, tol_abs=1e-10, max_num_steps=100000, check_interval=50):
+    """Conjugate gradient solver for the Poisson pressure equation with the Laplacian of :func:`torch_jacobi`.
+
+    Step sizes stay on the device; the convergence criterion of :func:`torch_jacobi` (mean squared residuum)
+    is evaluated before the first iteration and then only every `check_interval` iterations, which avoids
+    a host sync per iteration. In between, the step size is set to zero on the device once the criterion holds,
+    since further iterations would amplify rounding errors (and divide 0 by 0 when the residuum vanishes).
     """
-    Solve the pressure poisson equation using a jacobi scheme.
+    axes = tuple(range(dim))
+
+    def negative_laplacian(x):
+        neighbors = sum(pdroll(x, shifts=shift, dims=axis) for axis in axes for shift in (1, -1))
+        return (2 * dim * x - neighbors) / (dx ** 2)
+
+    r = -f - negative_laplacian(p)
+    d = r
+    rr = paddle.sum(r * r)
+    num_nodes = int(np.prod(r.shape))
+    if pdmean(r ** 2) < tol_abs:
+        return p
+    for it in range(1, max_num_steps + 1):
+        Ad = negative_laplacian(d)
+        alpha = _safe_divide(rr, paddle.sum(d * Ad))
+        alpha = paddle.where(rr / num_nodes < tol_abs, paddle.zeros_like(alpha), alpha)
+        p = p + alpha * d
+        r = r - alpha * Ad
+        rr_new = paddle.sum(r * r)
+        d = r + _safe_divide(rr_new, rr) * d
+        rr = rr_new
+        if it % check_interval == 0 and pdmean(r ** 2) < tol_abs:
+            break
+    return p
+
+
+def _safe_divide(numerator, denominator):
+    """numerator / denominator for a non-negative denominator, or zero where it is zero"""
+    # not `denominator == 0`: paddle compares floats for equality with an absolute tolerance
+    positive = denominator > 0
+    quotient = numerator / paddle.where(positive, denominator, paddle.ones_like(denominator))
+    return paddle.where(positive, quotient, paddle.zeros_like(quotient))
+
+
+def fft_poisson(f, p, dx, spectral=False):
+    """Direct solver for the periodic Poisson pressure equation by one real FFT and one inverse FFT.
+
+    By default, the Laplacian is the second-order finite difference operator of :func:`torch_jacobi`, so that
+    the result is the solution the Jacobi iteration converges to. With `spectral`, the exact symbol -|k|^2 is used
+    (consistent with :class:`SpectralDerivative`). The mean value of the initial guess p is kept.
+    """
+    shape = f.shape
+    axes = list(range(len(shape)))
+    symbol = 0
+    for d, n in enumerate(shape):
+        last = d == len(shape) - 1
+        k = 2 * np.pi * (np.fft.rfftfreq(n) if last else np.fft.fftfreq(n))
+        k_d = -(k / dx) ** 2 if spectral else -(2 * np.sin(k / 2) / dx) ** 2
+        broadcast = [1] * len(shape)
+        broadcast[d] = len(k)
+        symbol = symbol + k_d.reshape(broadcast)
+    inverse = np.zeros_like(symbol)
+    np.divide(1, symbol, out=inverse, where=symbol != 0)
+    complex_dtype = np.complex128 if f.dtype == paddle.float64 else np.complex64
+    inverse = paddle.to_tensor(inverse.astype(complex_dtype))
+    return paddle.fft.irfftn(paddle.fft.rfftn(f, axes=axes) * inverse, s=shape, axes=axes) + pdmean(p)
+
+
+def pressure_poisson(units, u, rho0, tol_abs=1e-10, max_num_steps=100000, derivative=None, solver="fft"):
+    """
+    Solve the pressure poisson equation on a periodic domain.
 
     Parameters
     ----------
@@ -164,7 +327,11 @@ def pressure_poisson(units, u, rho0, tol_abs=1e-10, max_num_steps=100000):
         Initial guess for the density (i.e., pressure).
     tol_abs : float
         The tolerance for pressure convergence.
-
+    derivative : FiniteDifferenceDerivative or SpectralDerivative
+        The derivative backend for the source term; defaults to second-order finite differences.
+    solver : str
+        "fft" (direct, see :func:`fft_poisson`), "cg" (see :func:`torch_conjugate_gradient`),
+        or "jacobi" (see :func:`torch_jacobi`). The iterative solvers use `tol_abs` and `max_num_steps`.
 
     Returns
     -------
@@ -176,25 +343,40 @@ def pressure_poisson(units, u, rho0, tol_abs=1e-10, max_num_steps=100000):
     u = units.convert_velocity_to_pu(u)
     p = units.convert_density_lu_to_pressure_pu(rho0)
 
+    derivative = FiniteDifferenceDerivative(order=2) if derivative is None else derivative
+
     # compute laplacian
     with paddle.no_grad():
         u_mod = paddle.zeros_like(u[0])
         dim = u.shape[0]
         for i in range(dim):
             for j in range(dim):
-                derivative = torch_gradient(torch_gradient(u[i] * u[j], dx)[i], dx)[j]
-                u_mod -= derivative
+                u_mod -= derivative.gradient(derivative.gradient(u[i] * u[j], dx)[i], dx)[j]
     # TODO(@MCBs): still not working in 3D
 
-    p_mod = torch_jacobi(
-        u_mod,
-        p[0],
-        dx,
-        units.lattice.device,
-        dim=units.lattice.D,
-        tol_abs=tol_abs,
-        max_num_steps=max_num_steps
-    )[None, ...]
+    if solver == "fft":
+        p_mod = fft_poisson(u_mod, p[0], dx, spectral=isinstance(derivative, SpectralDerivative))[None, ...]
+    elif solver == "cg":
+        p_mod = torch_conjugate_gradient(
+            u_mod,
+            p[0],
+            dx,
+            dim=units.lattice.D,
+            tol_abs=tol_abs,
+            max_num_steps=max_num_steps
+        )[None, ...]
+    elif solver == "jacobi":
+        p_mod = torch_jacobi(
+            u_mod,
+            p[0],
+            dx,
+            units.lattice.device,
+            dim=units.lattice.D,
+            tol_abs=tol_abs,
+            max_num_steps=max_num_steps
+        )[None, ...]
+    else:
+        raise LettuceException(f"Unknown Poisson solver {solver}; use 'fft', 'cg', or 'jacobi'.")
 
     return units.convert_pressure_pu_to_density_lu(p_mod)
 
@@ -203,3 +385,72 @@ def append_axes(array, n):
     index = (Ellipsis, ) + (None, ) * n
     return array[index]
 
+
+def ensemble_parameter(lattice, value):
+    """Turn one parameter value per ensemble member into a tensor that broadcasts against fields
+    of shape (..., B, *grid). Scalars are returned unchanged."""
+    if isinstance(value, paddle.Tensor):
+        return value if value.ndim == 0 else append_axes(value, lattice.D)
+    if np.ndim(value) == 0:
+        return value
+    return append_axes(lattice.convert_to_tensor(np.asarray(value)), lattice.D)
+
+
+def _is_field(value, grid_shape):
+    return (isinstance(value, (paddle.Tensor, np.ndarray)) and len(value.shape) >= len(grid_shape)
+            and tuple(value.shape[-len(grid_shape):]) == tuple(grid_shape))
+
+
+def _take(value, index, axis):
+    if isinstance(value, np.ndarray):
+        return np.take(value, index, axis=axis)
+    if value.dtype == paddle.bool:
+        # index_select has no kernel for bool
+        return _take(value.astype("int32"), index, axis).astype("bool")
+    return paddle.index_select(value, paddle.to_tensor(index), axis=axis % len(value.shape))
+
+
+def _cut_fields(obj, grid_shape, cuts):
+    """Cut the grid-shaped tensor attributes of obj (e.g. a boundary mask) by a list of (axis, index) pairs."""
+    for name, value in vars(obj).items():
+        if _is_field(value, grid_shape):
+            for axis, index in cuts:
+                value = _take(value, index, axis)
+            setattr(obj, name, value)
+
+
+def _is_node_local(collision):
+    """False for collisions that use neighboring nodes, e.g. the velocity gradient of a subgrid model."""
+    model = getattr(collision, "model", None)
+    if model is not None and not getattr(model, "node_local", True):
+        return False
+    inner = getattr(collision, "collision", None)
+    return inner is None or _is_node_local(inner)
+
+
+def _collision_name(collision):
+    model = getattr(collision, "model", None)
+    name = collision.__class__.__name__
+    return name if model is None else f"{name} with {model.__class__.__name__}"
+
+
+def _check_node_local(collision, feature):
+    if not _is_node_local(collision):
+        raise LettuceException(f"{_collision_name(collision)} couples neighboring nodes "
+                               f"and does not support {feature}.")
+
+
+def _check_cut(boundaries, collision, axes, feature):
+    """Reject what can not be computed on parts of the grid that are cut along the spatial `axes`:
+    boundaries on a side of the domain across these axes (outlets have to lie on a side that is not cut),
+    boundaries with precomputed links, and collisions that couple neighboring nodes (e.g. the WALE and Vreman
+    models of :class:`LESCollision`)."""
+    for boundary in boundaries:
+        index = getattr(boundary, "index", None)
+        if index is not None and any(index[axis] != slice(None) for axis in axes):
+            raise LettuceException(f"{boundary.__class__.__name__} lies on a side of the domain "
+                                   f"that is cut for {feature}.")
+        if getattr(boundary, "links", None) is not None:
+            raise LettuceException(f"{boundary.__class__.__name__} with precomputed links "
+                                   f"does not support {feature}.")
+    _check_node_local(collision, feature)
@@ -1,9 +1,12 @@
-import numpy as np
 import paddle
 
 def pdnorm(x,dim=None):
-    out = np.linalg.norm(x,axis=dim)
-    return paddle.to_tensor(out,dtype='float32')
+    out = paddle.sqrt(paddle.sum(x * x,axis=dim))
+    return out
+
+def pdmaxnorm(x,dim=0,reduce_dim=None):
+    out = paddle.sqrt(paddle.max(paddle.sum(x * x,axis=dim),axis=reduce_dim))
+    return out
 
 def pdzeros(size, dtype=None, device=None):
     out = paddle.zeros(shape=size,dtype=dtype)
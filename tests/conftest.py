@@ -0,0 +1,52 @@
+"""
+Fixtures and flow, collision and distribution factories shared by the tests.
+"""
+
+import numpy as np
+import paddle
+import pytest
+
+from lettuce import Lattice, D2Q9, TaylorGreenVortex2D, BGKCollision, BounceBackBoundary, Guo
+
+
+@pytest.fixture
+def lattice():
+    return Lattice(D2Q9, "cpu", dtype=paddle.float64)
+
+
+class _PorousTaylorGreen(TaylorGreenVortex2D):
+    """Taylor-Green vortex around a solid disk, resolved by `boundary_class` (a bounce-back boundary)."""
+
+    def __init__(self, lattice, boundary_class=BounceBackBoundary):
+        super().__init__(resolution=16, reynolds_number=10, mach_number=0.05, lattice=lattice)
+        self.boundary_class = boundary_class
+        x, y = self.grid
+        self.mask = np.sqrt((x - np.pi) ** 2 + (y - 2.0) ** 2) < 1.0
+
+    @property
+    def boundaries(self):
+        return [self.boundary_class(self.mask, self.units.lattice)]
+
+
+def _taylor_green(lattice):
+    return TaylorGreenVortex2D(resolution=16, reynolds_number=10, mach_number=0.05, lattice=lattice)
+
+
+def _bgk(lattice, flow):
+    return BGKCollision(lattice, tau=flow.units.relaxation_parameter_lu)
+
+
+def _field_force_collision(lattice, flow):
+    x, y = flow.grid
+    acceleration = 1e-4 * np.stack([np.sin(y), np.cos(x)])
+    tau = flow.units.relaxation_parameter_lu
+    return BGKCollision(lattice, tau=tau, force=Guo(lattice, tau=tau, acceleration=acceleration))
+
+
+def _random_f(lattice, shape, seed=1):
+    """A perturbed equilibrium with random density and velocity."""
+    random = np.random.RandomState(seed)
+    rho = lattice.convert_to_tensor(1 + 0.1 * random.random_sample((1,) + shape))
+    u = lattice.convert_to_tensor(0.1 * (random.random_sample((lattice.D,) + shape) - 0.5))
+    noise = lattice.convert_to_tensor(1e-3 * random.random_sample((lattice.Q,) + shape))
+    return lattice.equilibrium(rho, u) + noise
@@ -0,0 +1,165 @@
+"""
+Tests for boundary conditions.
+"""
+
+import numpy as np
+import paddle
+import pytest
+
+from lettuce import (
+    Lattice, D2Q9, D3Q19, Obstacle, BGKCollision, StandardStreaming, Simulation, BounceBackBoundary,
+    HalfwayBounceBackBoundary, EquilibriumBoundaryPU, EquilibriumOutletP, AntiBounceBackOutlet, UnitConversion
+)
+
+from conftest import _random_f
+
+
+def _random_mask(shape, seed=0):
+    return np.random.RandomState(seed).random_sample(shape) < 0.3
+
+
+class _SparseObstacle(Obstacle):
+    @property
+    def boundaries(self):
+        boundaries = super().boundaries
+        boundaries[-1] = BounceBackBoundary(self.mask, self.units.lattice, sparse=True)
+        return boundaries
+
+
+@pytest.mark.parametrize("flow_class", [Obstacle, _SparseObstacle])
+def test_sparse_bounce_back_matches_dense_on_fluid(lattice, flow_class):
+    def run(flow_class):
+        flow = flow_class((24, 16), reynolds_number=10, mach_number=0.1, lattice=lattice, domain_length_x=3)
+        x, y = flow.grid
+        flow.mask = np.sqrt((x - 1.0) ** 2 + (y - 1.0) ** 2) < 0.3
+        collision = BGKCollision(lattice, tau=flow.units.relaxation_parameter_lu)
+        simulation = Simulation(flow, lattice, collision, StandardStreaming(lattice))
+        simulation.step(num_steps=5)
+        return simulation.f.numpy(), flow.mask
+
+    dense, mask = run(Obstacle)
+    sparse, _ = run(flow_class)
+    np.testing.assert_allclose(sparse[:, ~mask], dense[:, ~mask], rtol=1e-12, atol=1e-14)
+
+
+@pytest.mark.parametrize("stencil", [D2Q9, D3Q19])
+def test_sparse_bounce_back_on_links(stencil):
+    lattice = Lattice(stencil, "cpu", dtype=paddle.float64)
+    shape = (6,) * lattice.D
+    mask = _random_mask(shape)
+    f = _random_f(lattice, shape)
+    dense = BounceBackBoundary(mask, lattice)(f.clone()).numpy()
+    f_in = f.clone()
+    sparse = BounceBackBoundary(mask, lattice, sparse=True)(f_in)
+    np.testing.assert_array_equal(f_in.numpy(), sparse.numpy())
+    # all populations that a solid node sends to a fluid node are bounced
+    dims = tuple(range(lattice.D))
+    for i, e in enumerate(lattice.stencil.e):
+        sends_to_fluid = mask & ~np.roll(mask, shift=tuple(-e), axis=dims)
+        np.testing.assert_array_equal(sparse.numpy()[i][sends_to_fluid], dense[i][sends_to_fluid])
+
+
+def test_halfway_bounce_back_returns_populations_to_the_fluid_node(lattice):
+    shape = (7, 5)
+    mask = _random_mask(shape)
+    f = _random_f(lattice, shape)
+    expected = f.numpy().copy()
+    for i, e in enumerate(lattice.stencil.e):
+        for x in np.argwhere(mask):
+            fluid = tuple((x - e) % shape)
+            if not mask[fluid]:
+                expected[(lattice.stencil.opposite[i],) + fluid] = f.numpy()[(i,) + tuple(x)]
+    f_in = f.clone()
+    result = HalfwayBounceBackBoundary(mask, lattice)(f_in)
+    np.testing.assert_array_equal(result.numpy(), expected)
+    np.testing.assert_array_equal(f_in.numpy(), expected)
+
+
+def test_sparse_bounce_back_on_a_slice(lattice):
+    shape = (6, 5)
+    mask = _random_mask(shape)
+    padded = _random_f(lattice, (6, 7))
+    f = padded[:, :, 1:-1]
+    expected = BounceBackBoundary(mask, lattice, sparse=True)(f.clone()).numpy()
+    np.testing.assert_array_equal(BounceBackBoundary(mask, lattice, sparse=True)(f).numpy(), expected)
+
+
+def _units(lattice):
+    return UnitConversion(lattice, reynolds_number=10, mach_number=0.1, characteristic_length_lu=10)
+
+
+def test_equilibrium_boundary_sets_equilibrium_in_place(lattice):
+    shape = (6, 5)
+    mask = _random_mask(shape)
+    units = _units(lattice)
+    velocity = np.array([0.3, -0.1])
+    f = _random_f(lattice, shape)
+    f_in = f.clone()
+    result = EquilibriumBoundaryPU(mask, lattice, units, velocity, pressure=0.01)(f_in)
+    rho = units.convert_pressure_pu_to_density_lu(lattice.convert_to_tensor(np.full((1,) + shape, 0.01)))
+    u = units.convert_velocity_to_lu(lattice.convert_to_tensor(velocity[:, None, None] * np.ones((2,) + shape)))
+    feq = lattice.equilibrium(rho, u).numpy()
+    np.testing.assert_allclose(result.numpy()[:, mask], feq[:, mask], rtol=1e-12)
+    np.testing.assert_array_equal(result.numpy()[:, ~mask], f.numpy()[:, ~mask])
+    np.testing.assert_array_equal(f_in.numpy(), result.numpy())
+
+
+def test_equilibrium_boundary_evaluates_callables_at_the_step_time(lattice):
+    shape = (4, 4)
+    mask = np.zeros(shape, dtype=bool)
+    mask[0] = True
+    units = _units(lattice)
+    times = []
+
+    def velocity(t, x):
+        times.append(t)
+        return np.array([0.1, 0.0])
+
+    boundary = EquilibriumBoundaryPU(mask, lattice, units, velocity)
+    f = _random_f(lattice, shape)
+    for _ in range(3):
+        f = boundary(f)
+    np.testing.assert_allclose(times, [units.convert_time_to_pu(i) for i in (1, 2, 3)])
+
+
+def test_equilibrium_outlet_sets_the_equilibrium_of_the_neighboring_velocity(lattice):
+    shape = (6, 5)
+    f = _random_f(lattice, shape)
+    expected = f.numpy().copy()
+    u = lattice.u(f).numpy()[:, -2]
+    rho = np.full((1, shape[1]), 1.02)
+    expected[:, -1] = lattice.equilibrium(lattice.convert_to_tensor(rho), lattice.convert_to_tensor(u)).numpy()
+    result = EquilibriumOutletP(lattice, [1, 0], rho0=1.02)(f)
+    np.testing.assert_allclose(result.numpy(), expected, rtol=1e-12)
+
+
+@pytest.mark.parametrize("stencil, shape, direction", [
+    (D2Q9, (6, 5), [1, 0]),
+    (D2Q9, (6, 5), [0, -1]),
+    (D3Q19, (3, 4, 5), [0, 0, 1]),
+    (D3Q19, (3, 4, 5), [-1, 0, 0]),
+])
+def test_anti_bounce_back_outlet_matches_formula(stencil, shape, direction):
+    lattice = Lattice(stencil, "cpu", dtype=paddle.float64)
+    f = _random_f(lattice, shape)
+    f_np = f.numpy()
+    rho, u = lattice.rho(f).numpy(), lattice.u(f).numpy()
+    axis = int(np.flatnonzero(direction)[0])
+    here, other = (-1, -2) if direction[axis] > 0 else (0, 1)
+    rho_w = np.take(rho[0], here, axis=axis)
+    u_here, u_other = np.take(u, here, axis=axis + 1), np.take(u, other, axis=axis + 1)
+    u_w = u_here + 0.5 * (u_here - u_other)
+    cs2 = stencil.cs ** 2
+    expected = f_np.copy()
+    plane = [slice(None)] * lattice.D
+    plane[axis] = here
+    # Krüger et al. (2016), eq. 5.53: f_opp(i) = -f_i + 2 w_i rho_w [1 + (e_i.u_w)^2 / (2 cs^4) - u_w^2 / (2 cs^2)]
+    for i, e in enumerate(stencil.e):
+        if np.dot(e, direction) > 0:
+            eu = np.einsum("d,d...->...", e, u_w)
+            uu = np.einsum("d...,d...->...", u_w, u_w)
+            expected[(stencil.opposite[i],) + tuple(plane)] = (
+                -f_np[(i,) + tuple(plane)] + 2 * stencil.w[i] * rho_w * (1 + eu ** 2 / (2 * cs2 ** 2) - uu / (2 * cs2))
+            )
+    result = AntiBounceBackOutlet(lattice, direction)(f)
+    np.testing.assert_allclose(result.numpy(), expected, rtol=1e-12)
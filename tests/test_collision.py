@@ -0,0 +1,178 @@
+"""
+Tests for collision operators.
+"""
+
+import warnings
+
+import numpy as np
+import paddle
+import pytest
+
+from lettuce import (
+    Lattice, D1Q3, D2Q9, D3Q27, MRTCollision, D1Q3Transform, D2Q9Dellar, D2Q9Lallemand, D3Q27Hermite,
+    TaylorGreenVortex2D, WALEModel, VremanModel, LESCollision, ChunkedCollision, BGKCollision, LettuceException,
+    RecursiveRegularizedCollision, KBCCollision2D, KBCCollision3D,
+    TRTCollision
+)
+
+from conftest import _random_f, _taylor_green, _field_force_collision
+
+
+@pytest.mark.parametrize("stencil, transform_class, uses_moment_equilibrium", [
+    (D1Q3, D1Q3Transform, False),
+    (D2Q9, D2Q9Dellar, False),
+    (D2Q9, D2Q9Lallemand, True),
+    (D3Q27, D3Q27Hermite, True),
+])
+def test_mrt_fused_matches_transform(stencil, transform_class, uses_moment_equilibrium):
+    lattice = Lattice(stencil, "cpu", dtype=paddle.float64)
+    transform = transform_class(lattice)
+    relaxation_parameters = 0.6 + np.arange(lattice.Q) / lattice.Q
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        collision = MRTCollision(lattice, transform, relaxation_parameters)
+    assert transform.lattice_equilibrium != uses_moment_equilibrium
+    assert (collision.relaxation_matrix is None) == uses_moment_equilibrium
+    assert (collision.relaxed_inverse is not None) == uses_moment_equilibrium
+
+    f = _random_f(lattice, (4,) * lattice.D)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        m = transform.transform(f)
+        meq = transform.equilibrium(m)
+    rates = lattice.convert_to_tensor(1 / relaxation_parameters)
+    expected = transform.inverse_transform(m - lattice.einsum("q,q->q", [rates, m - meq]))
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        result = collision(f)
+    np.testing.assert_allclose(result.numpy(), expected.numpy(), rtol=1e-10, atol=1e-12)
+
+
+def test_wale_vanishes_in_two_dimensional_incompressible_flow():
+    # in 2D, the traceless symmetric part of g^2 is zero for any divergence-free velocity gradient g
+    lattice = Lattice(D2Q9, "cpu", dtype=paddle.float64)
+    flow = TaylorGreenVortex2D(resolution=16, reynolds_number=10, mach_number=0.05, lattice=lattice)
+    p, u = flow.initial_solution(flow.grid)
+    rho = flow.units.convert_pressure_pu_to_density_lu(lattice.convert_to_tensor(p))
+    u = flow.units.convert_velocity_to_lu(lattice.convert_to_tensor(u))
+    f = lattice.equilibrium(rho, u)
+    tau = flow.units.relaxation_parameter_lu
+    relaxation_time = WALEModel().relaxation_time(lattice, tau, rho, u, f - lattice.equilibrium(rho, u))
+    np.testing.assert_allclose(relaxation_time.numpy(), tau, rtol=1e-12)
+
+
+def test_chunked_collision_cuts_force_fields_to_the_slabs(lattice):
+    flow = _taylor_green(lattice)
+    f = _random_f(lattice, (16, 16))
+    expected = _field_force_collision(lattice, flow)(f).numpy()
+    collision = _field_force_collision(lattice, flow)
+    # a budget for three layers per slab, so that the last slab is shorter
+    layer_bytes = lattice.Q * 16 * 8
+    chunked = ChunkedCollision(collision, lattice, memory_budget=3 * 8 * layer_bytes)
+    assert chunked.slab_size(f.shape) == 3
+    np.testing.assert_allclose(chunked(f).numpy(), expected, rtol=1e-12)
+    np.testing.assert_allclose(chunked(f).numpy(), expected, rtol=1e-12)
+
+
+def test_chunked_collision_rejects_non_local_collisions(lattice):
+    with pytest.raises(LettuceException):
+        ChunkedCollision(LESCollision(lattice, tau=0.6, model=VremanModel()), lattice, memory_budget=1)
+
+
+@pytest.mark.parametrize("with_force", [False, True])
+def test_bgk_collision_keeps_its_input(lattice, with_force):
+    flow = _taylor_green(lattice)
+    f = _random_f(lattice, (16, 16))
+    f_in = f.clone()
+    if with_force:
+        collision = _field_force_collision(lattice, flow)
+    else:
+        collision = BGKCollision(lattice, tau=flow.units.relaxation_parameter_lu)
+    result = collision(f_in)
+    np.testing.assert_array_equal(f_in.numpy(), f.numpy())
+    rho, u = lattice.rho(f), lattice.u(f)
+    if with_force:
+        u = u + collision.force.u_eq(f, rho)
+    expected = f - (f - lattice.equilibrium(rho, u)) / collision.tau
+    if with_force:
+        expected = expected + collision.force.source_term(u)
+    np.testing.assert_allclose(result.numpy(), expected.numpy(), rtol=1e-12)
+
+
+def test_recursive_regularized_collision_conserves_mass_and_momentum():
+    lattice = Lattice(D3Q27, "cpu", dtype=paddle.float64)
+    f = _random_f(lattice, (3, 4, 5))
+    f_post = RecursiveRegularizedCollision(lattice, tau=0.7)(f)
+    np.testing.assert_allclose(lattice.rho(f_post).numpy(), lattice.rho(f).numpy(), rtol=1e-12)
+    np.testing.assert_allclose(lattice.j(f_post).numpy(), lattice.j(f).numpy(), rtol=1e-12, atol=1e-14)
+
+
+def test_recursive_regularized_collision_relaxes_the_regularized_non_equilibrium():
+    lattice = Lattice(D3Q27, "cpu", dtype=paddle.float64)
+    tau = 0.7
+    f = _random_f(lattice, (3, 4, 5))
+    f_post = RecursiveRegularizedCollision(lattice, tau=tau)(f)
+    rho, u = lattice.rho(f), lattice.u(f)
+    feq = lattice.equilibrium(rho, u)
+    # Pi_neq relaxes with 1 - 1/tau; the third-order terms have no second moments
+    pi_neq = lattice.shear_tensor(f - feq).numpy()
+    np.testing.assert_allclose(lattice.shear_tensor(f_post - feq).numpy(), (1 - 1 / tau) * pi_neq, rtol=1e-10)
+
+    # term by term: w_i [H2_i:Pi / (2 cs^4) + H3_i:a3 / (6 cs^6)], without the unresolved xxx, yyy, zzz terms
+    e, w, cs2 = D3Q27.e, D3Q27.w, D3Q27.cs ** 2
+    u = u.numpy()
+    delta = np.eye(3)
+    a3 = (np.einsum("a...,bc...->abc...", u, pi_neq) + np.einsum("b...,ac...->abc...", u, pi_neq)
+          + np.einsum("c...,ab...->abc...", u, pi_neq))
+    h2 = np.einsum("qa,qb->qab", e, e) - cs2 * delta
+    h3 = (np.einsum("qa,qb,qc->qabc", e, e, e) - cs2 * (np.einsum("qa,bc->qabc", e, delta)
+          + np.einsum("qb,ac->qabc", e, delta) + np.einsum("qc,ab->qabc", e, delta)))
+    for a in range(3):
+        h3[:, a, a, a] = 0
+    f_neq = (np.einsum("qab,ab...->q...", h2, pi_neq) / (2 * cs2 ** 2)
+             + np.einsum("qabc,abc...->q...", h3, a3) / (6 * cs2 ** 3))
+    expected = feq.numpy() + (1 - 1 / tau) * w.reshape(-1, 1, 1, 1) * f_neq
+    np.testing.assert_allclose(f_post.numpy(), expected, rtol=1e-10)
+
+
+def test_recursive_regularized_collision_rejects_other_stencils():
+    with pytest.raises(AssertionError):
+        RecursiveRegularizedCollision(Lattice(D2Q9, "cpu", dtype=paddle.float64), tau=0.7)
+
+
+@pytest.mark.parametrize("stencil, collision_class, shape", [
+    (D2Q9, KBCCollision2D, (5, 6)),
+    (D3Q27, KBCCollision3D, (3, 4, 5)),
+])
+def test_kbc_shear_projection_matches_moment_form(stencil, collision_class, shape):
+    lattice = Lattice(stencil, "cpu", dtype=paddle.float64)
+    collision = collision_class(lattice, tau=0.55)
+    f = _random_f(lattice, shape)
+    feq = lattice.equilibrium(lattice.rho(f), lattice.u(f))
+    # the moment form: delta_s = s(f) - s(feq), delta_h = f - feq - delta_s
+    delta_s = (collision.compute_s_seq_from_m(f, collision.kbc_moment_transform(f))
+               - collision.compute_s_seq_from_m(feq, collision.kbc_moment_transform(feq)))
+    np.testing.assert_allclose(lattice.mv(collision.shear_projection, f - feq).numpy(), delta_s.numpy(),
+                               rtol=1e-10, atol=1e-14)
+    delta_h = f - feq - delta_s
+    sum_s = lattice.rho(delta_s * delta_h / feq)
+    sum_h = lattice.rho(delta_h * delta_h / feq)
+    gamma = 1 / collision.beta - (2 - 1 / collision.beta) * sum_s / sum_h
+    expected = f - collision.beta * (2 * delta_s + gamma * delta_h)
+    np.testing.assert_allclose(collision(f).numpy(), expected.numpy(), rtol=1e-10)
+
+
+@pytest.mark.parametrize("stencil, shape", [(D2Q9, (5, 6)), (D3Q27, (3, 4, 5))])
+def test_trt_collision_with_magic_parameter(stencil, shape):
+    lattice = Lattice(stencil, "cpu", dtype=paddle.float64)
+    tau, magic = 0.8, 3 / 16
+    collision = TRTCollision(lattice, tau=tau, magic=magic)
+    tau_minus = magic / (tau - 0.5) + 0.5
+    assert collision.tau_minus == pytest.approx(tau_minus)
+    assert collision.magic == pytest.approx(magic)
+    f = _random_f(lattice, shape)
+    f_neq = (f - lattice.equilibrium(lattice.rho(f), lattice.u(f))).numpy()
+    f_neq_opposite = f_neq[lattice.stencil.opposite]
+    # the symmetric part relaxes with tau, the antisymmetric part with tau_minus
+    expected = f.numpy() - 0.5 * (f_neq + f_neq_opposite) / tau - 0.5 * (f_neq - f_neq_opposite) / tau_minus
+    np.testing.assert_allclose(collision(f).numpy(), expected, rtol=1e-12)
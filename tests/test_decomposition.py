@@ -0,0 +1,72 @@
+"""
+Tests for the domain decomposition across processes.
+"""
+
+import os
+
+import numpy as np
+import paddle
+import pytest
+
+from lettuce import (
+    Lattice, D2Q9, Obstacle, LESCollision, WALEModel, StandardStreaming, Simulation, DecomposedSimulation,
+    LettuceException
+)
+
+from conftest import _taylor_green, _bgk, _field_force_collision
+
+
+def _obstacle(lattice):
+    flow = Obstacle((24, 16), reynolds_number=10, mach_number=0.1, lattice=lattice, domain_length_x=3)
+    x, y = flow.grid
+    flow.mask = np.sqrt((x - 1.0) ** 2 + (y - 1.0) ** 2) < 0.3
+    return flow
+
+
+@pytest.mark.parametrize("make_flow, make_collision", [
+    (_taylor_green, _bgk),
+    (_obstacle, _bgk),
+    (_taylor_green, _field_force_collision),
+])
+def test_decomposed_simulation_matches_simulation(make_flow, make_collision):
+    lattice = Lattice(D2Q9, "cpu", dtype=paddle.float64)
+    flow = make_flow(lattice)
+    reference = Simulation(flow, lattice, make_collision(lattice, flow), StandardStreaming(lattice))
+    reference.step(num_steps=6)
+    decomposed = DecomposedSimulation(flow, lattice, make_collision(lattice, flow), StandardStreaming(lattice),
+                                      num_workers=3)
+    try:
+        decomposed.step(num_steps=6)
+    finally:
+        decomposed.close()
+    np.testing.assert_allclose(decomposed.f.numpy(), reference.f.numpy(), rtol=1e-12, atol=1e-14)
+
+
+def test_decomposition_rejects_nonlocal_collision():
+    lattice = Lattice(D2Q9, "cpu", dtype=paddle.float64)
+    flow = _taylor_green(lattice)
+    collision = LESCollision(lattice, tau=flow.units.relaxation_parameter_lu, model=WALEModel())
+    with pytest.raises(LettuceException):
+        DecomposedSimulation(flow, lattice, collision, StandardStreaming(lattice), num_workers=2)
+
+
+class _DiesInWorker:
+    """Collision that terminates the worker process while its setup is unpickled."""
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return os._exit, (3,)
+
+    def __call__(self, f):
+        return f
+
+
+def test_dead_worker_raises():
+    lattice = Lattice(D2Q9, "cpu", dtype=paddle.float64)
+    simulation = DecomposedSimulation(_taylor_green(lattice), lattice, _DiesInWorker(), StandardStreaming(lattice),
+                                      num_workers=2)
+    simulation.poll_interval = 0.1
+    with pytest.raises(LettuceException, match="exited with code 3"):
+        simulation.step(num_steps=1)
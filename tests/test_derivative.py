@@ -0,0 +1,47 @@
+"""
+Tests for the derivative backends.
+"""
+
+import numpy as np
+import paddle
+import pytest
+
+from lettuce import FiniteDifferenceDerivative, SpectralDerivative
+
+BACKENDS = [(FiniteDifferenceDerivative(order=6), 1e-4), (SpectralDerivative(), 1e-10)]
+
+
+def _grid(n, dim):
+    dx = 2 * np.pi / n
+    return np.meshgrid(*[np.arange(n) * dx] * dim, indexing="ij"), dx
+
+
+@pytest.mark.parametrize("derivative, tol", BACKENDS)
+def test_gradient_and_velocity_gradient(derivative, tol):
+    (x, y), dx = _grid(32, 2)
+    u = np.stack([np.sin(x) * np.cos(2 * y), np.cos(x)])
+    expected = np.stack([
+        np.stack([np.cos(x) * np.cos(2 * y), -2 * np.sin(x) * np.sin(2 * y)]),
+        np.stack([-np.sin(x), np.zeros_like(x)]),
+    ])
+    gradient = derivative.gradient(paddle.to_tensor(u[0]), dx=dx).numpy()
+    np.testing.assert_allclose(gradient, expected[0], atol=tol)
+    np.testing.assert_allclose(derivative.velocity_gradient(paddle.to_tensor(u), dx=dx).numpy(), expected, atol=tol)
+
+
+@pytest.mark.parametrize("derivative, tol", BACKENDS)
+def test_divergence_and_curl_2d(derivative, tol):
+    (x, y), dx = _grid(32, 2)
+    u = paddle.to_tensor(np.stack([np.sin(x) * np.cos(y), np.sin(y)]))
+    np.testing.assert_allclose(derivative.divergence(u, dx=dx).numpy(), np.cos(x) * np.cos(y) + np.cos(y), atol=tol)
+    np.testing.assert_allclose(derivative.curl(u, dx=dx).numpy(), np.sin(x) * np.sin(y), atol=tol)
+
+
+@pytest.mark.parametrize("derivative, tol", BACKENDS)
+def test_divergence_and_curl_3d(derivative, tol):
+    (x, y, z), dx = _grid(16, 3)
+    u = paddle.to_tensor(np.stack([np.sin(y), np.sin(z), np.sin(x) * np.cos(z)]))
+    expected_curl = np.stack([-np.cos(z), -np.cos(x) * np.cos(z), -np.cos(y)])
+    tol = 10 * tol
+    np.testing.assert_allclose(derivative.divergence(u, dx=dx).numpy(), -np.sin(x) * np.sin(z), atol=tol)
+    np.testing.assert_allclose(derivative.curl(u, dx=dx).numpy(), expected_curl, atol=tol)
@@ -0,0 +1,100 @@
+"""
+Tests for ensembles of flows in one distribution tensor.
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from lettuce import (
+    TaylorGreenVortex2D, EnsembleFlow, BGKCollision, LESCollision, Guo, StandardStreaming, Simulation,
+    MaximumVelocity, IncompressibleKineticEnergy, Enstrophy, EnergySpectrum, SpectralDerivative,
+    ObservableReporter, VTKReporter
+)
+
+REYNOLDS_NUMBERS = (10, 20, 40)
+
+
+def _bgk(lattice, tau):
+    return BGKCollision(lattice, tau=tau)
+
+
+def _guo(lattice, tau):
+    return BGKCollision(lattice, tau=tau, force=Guo(lattice, tau=tau, acceleration=[1e-4, -2e-4]))
+
+
+def _les(lattice, tau):
+    return LESCollision(lattice, tau=tau)
+
+
+def _simulation(lattice, flow, make_collision=_bgk):
+    collision = make_collision(lattice, flow.units.relaxation_parameter_lu)
+    return Simulation(flow=flow, lattice=lattice, collision=collision, streaming=StandardStreaming(lattice))
+
+
+def _members(lattice):
+    return [TaylorGreenVortex2D(16, re, 0.05, lattice) for re in REYNOLDS_NUMBERS]
+
+
+@pytest.mark.parametrize("make_collision", [_bgk, _guo, _les])
+def test_ensemble_matches_members(lattice, make_collision):
+    ensemble = _simulation(lattice, EnsembleFlow(_members(lattice)), make_collision)
+    ensemble.step(num_steps=5)
+    for b, flow in enumerate(_members(lattice)):
+        single = _simulation(lattice, flow, make_collision)
+        single.step(num_steps=5)
+        np.testing.assert_allclose(ensemble.f[:, b].numpy(), single.f.numpy(), rtol=1e-12, atol=1e-14)
+
+
+def test_ensemble_initialization_matches_members(lattice):
+    ensemble = _simulation(lattice, EnsembleFlow(_members(lattice)))
+    ensemble.initialize_pressure()
+    ensemble.initialize_f_neq()
+    for b, flow in enumerate(_members(lattice)):
+        single = _simulation(lattice, flow)
+        single.initialize_pressure()
+        single.initialize_f_neq()
+        np.testing.assert_allclose(ensemble.f[:, b].numpy(), single.f.numpy(), rtol=1e-12, atol=1e-14)
+
+
+@pytest.mark.parametrize("observable_class, kwargs", [
+    (MaximumVelocity, {}),
+    (IncompressibleKineticEnergy, {}),
+    (Enstrophy, dict(derivative=SpectralDerivative())),
+    (EnergySpectrum, {}),
+])
+def test_observables_per_member(lattice, observable_class, kwargs):
+    flow = EnsembleFlow(_members(lattice))
+    ensemble = _simulation(lattice, flow)
+    ensemble.step(num_steps=3)
+    observed = observable_class(lattice, flow, **kwargs)(ensemble.f).numpy()
+    assert observed.shape[-1] == len(REYNOLDS_NUMBERS)
+    for b, member in enumerate(_members(lattice)):
+        single = _simulation(lattice, member)
+        single.step(num_steps=3)
+        expected = observable_class(lattice, member, **kwargs)(single.f).numpy()
+        np.testing.assert_allclose(observed[..., b], expected, rtol=1e-10, atol=1e-14)
+
+
+def test_observable_reporter_writes_one_row_per_member(lattice):
+    flow = EnsembleFlow(_members(lattice))
+    simulation = _simulation(lattice, flow)
+    reporter = ObservableReporter(MaximumVelocity(lattice, flow), interval=2, out=None)
+    simulation.reporters.append(reporter)
+    simulation.step(num_steps=2)
+    assert [row[:2] for row in reporter.out] == [[i, b] for i in (0, 2) for b in range(len(REYNOLDS_NUMBERS))]
+    times = flow.units.convert_time_to_pu(2)
+    for row in reporter.out[len(REYNOLDS_NUMBERS):]:
+        assert row[2] == pytest.approx(times[row[1]])
+        assert len(row) == 4
+
+
+def test_vtk_reporter_writes_one_file_per_member(lattice, tmp_path):
+    flow = EnsembleFlow(_members(lattice))
+    simulation = _simulation(lattice, flow)
+    simulation.reporters.append(VTKReporter(lattice, flow, interval=1, filename_base=str(tmp_path / "out")))
+    simulation.step(num_steps=1)
+    for b in range(len(REYNOLDS_NUMBERS)):
+        for i in (0, 1):
+            assert os.path.isfile(tmp_path / f"out_member{b}_{i:08d}.vtr")
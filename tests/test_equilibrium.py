@@ -0,0 +1,30 @@
+"""
+Tests for the equilibria.
+"""
+
+import numpy as np
+import paddle
+import pytest
+
+from lettuce import Lattice, D2Q9, D3Q19, D3Q27, UnrolledQuadraticEquilibrium
+
+
+def _quadratic_reference(stencil, rho, u):
+    """w_i rho [1 + e_i.u / cs^2 + (e_i.u)^2 / (2 cs^4) - u.u / (2 cs^2)]"""
+    cs2 = stencil.cs ** 2
+    eu = np.einsum("qd,d...->q...", stencil.e, u)
+    uu = np.einsum("d...,d...->...", u, u)
+    w = stencil.w.reshape([-1] + [1] * (u.ndim - 1))
+    return w * rho * (1 + eu / cs2 + eu ** 2 / (2 * cs2 ** 2) - uu / (2 * cs2))
+
+
+@pytest.mark.parametrize("stencil, shape", [(D2Q9, (5, 6)), (D3Q19, (3, 4, 5)), (D3Q27, (3, 4, 5))])
+@pytest.mark.parametrize("rho_with_axis", [False, True])
+def test_unrolled_equilibrium_matches_quadratic_formula(stencil, shape, rho_with_axis):
+    lattice = Lattice(stencil, "cpu", dtype=paddle.float64)
+    assert isinstance(lattice.equilibrium, UnrolledQuadraticEquilibrium)
+    random = np.random.RandomState(0)
+    rho = 1 + 0.1 * random.random_sample((1,) + shape)
+    u = 0.1 * (random.random_sample((stencil.D(),) + shape) - 0.5)
+    feq = lattice.equilibrium(lattice.convert_to_tensor(rho if rho_with_axis else rho[0]), lattice.convert_to_tensor(u))
+    np.testing.assert_allclose(feq.numpy(), _quadratic_reference(stencil, rho, u), rtol=1e-12)
@@ -0,0 +1,45 @@
+"""
+Tests for forcing schemes.
+"""
+
+import numpy as np
+import paddle
+import pytest
+
+from lettuce import Lattice, D2Q9, D3Q19, Guo
+
+
+def _guo_reference(stencil, tau, u, acceleration):
+    """Source term of Guo et al. (2002), term by term."""
+    e, w, cs = stencil.e, stencil.w, stencil.cs
+    grid = u.shape[1:]
+    if acceleration.ndim == 1:
+        acceleration = acceleration.reshape((-1,) + (1,) * len(grid))
+    source = np.zeros((len(w),) + grid)
+    for i in range(len(w)):
+        ei = e[i].reshape((-1,) + (1,) * len(grid))
+        eu = (ei * u).sum(axis=0)
+        source[i] = w[i] * (((ei - u) / cs ** 2 + eu * ei / cs ** 4) * acceleration).sum(axis=0)
+    return (1 - 1 / (2 * tau)) * source
+
+
+@pytest.mark.parametrize("stencil", [D2Q9, D3Q19])
+@pytest.mark.parametrize("field", [False, True])
+def test_guo_source_term(stencil, field):
+    lattice = Lattice(stencil, "cpu", dtype=paddle.float64)
+    grid = (5,) * lattice.D
+    random = np.random.RandomState(0)
+    u = 0.1 * (random.random_sample((lattice.D,) + grid) - 0.5)
+    acceleration = 1e-3 * random.random_sample((lattice.D,) + grid if field else (lattice.D,))
+    force = Guo(lattice, tau=0.8, acceleration=acceleration)
+    source = force.source_term(lattice.convert_to_tensor(u)).numpy()
+    np.testing.assert_allclose(source, _guo_reference(lattice.stencil, 0.8, u, acceleration), rtol=1e-12, atol=1e-16)
+
+
+def test_guo_updates_precomputed_terms_with_the_acceleration():
+    lattice = Lattice(D2Q9, "cpu", dtype=paddle.float64)
+    u = 0.05 * np.ones((2, 3, 3))
+    force = Guo(lattice, tau=0.8, acceleration=[1e-3, 0.0])
+    force.acceleration = np.array([0.0, 2e-3])
+    source = force.source_term(lattice.convert_to_tensor(u)).numpy()
+    np.testing.assert_allclose(source, _guo_reference(lattice.stencil, 0.8, u, np.array([0.0, 2e-3])), rtol=1e-12)
@@ -0,0 +1,37 @@
+"""
+Tests for the lattice.
+"""
+
+import numpy as np
+import paddle
+import pytest
+
+from lettuce import Lattice, D2Q9
+from lettuce.lattices import _einsum_plan, _EinsumPlan, _MatmulPlan, _ProductPlan
+
+GRID = (4, 5)
+
+
+@pytest.mark.parametrize("equation, shapes, local, plan_class", [
+    ("ij,j->i", [(9, 9), (9,)], [False, True], _MatmulPlan),
+    ("qd,q->d", [(9, 2), (9,)], [False, True], _MatmulPlan),
+    ("qa,a->q", [(9, 2), (2,)], [False, True], _MatmulPlan),
+    ("ab,iab->i", [(2, 2), (9, 2, 2)], [True, False], _MatmulPlan),
+    ("qabc,abc->q", [(9, 2, 2, 2), (2, 2, 2)], [False, True], _MatmulPlan),
+    ("ab,ab->", [(2, 2), (2, 2)], [True, True], _ProductPlan),
+    ("q,q->q", [(9,), (9,)], [False, True], _ProductPlan),
+    ("im,jm->ij", [(2, 2), (2, 2)], [True, True], _EinsumPlan),
+    ("ia,ib->iab", [(9, 2), (9, 2)], [False, False], _EinsumPlan),
+])
+def test_einsum_plans_match_numpy(equation, shapes, local, plan_class):
+    lattice = Lattice(D2Q9, "cpu", dtype=paddle.float64)
+    random = np.random.RandomState(0)
+    arrays = [random.random_sample(shape + GRID if is_local else shape) for shape, is_local in zip(shapes, local)]
+    fields = [lattice.convert_to_tensor(array) for array in arrays]
+    assert isinstance(_einsum_plan(equation, [len(field.shape) for field in fields]), plan_class)
+    inputs, output = equation.split("->")
+    numpy_equation = ",".join(
+        indices + "..." if is_local else indices for indices, is_local in zip(inputs.split(","), local)
+    ) + "->" + output + ("..." if any(local) else "")
+    expected = np.einsum(numpy_equation, *arrays)
+    np.testing.assert_allclose(lattice.einsum(equation, fields).numpy(), expected, rtol=1e-12)
@@ -0,0 +1,38 @@
+"""
+Tests for the observables.
+"""
+
+import numpy as np
+import paddle
+import pytest
+
+from lettuce import Lattice, D2Q9, D3Q27, TaylorGreenVortex2D, TaylorGreenVortex3D, EnergySpectrum
+
+
+def _wavemask_spectrum(flow, u):
+    """Energy of the full spectrum, summed over the boolean shell masks |k| in (k - 1/2, k + 1/2]."""
+    D = u.shape[0]
+    dx = flow.units.convert_length_to_pu(1.0)
+    dimensions = u.shape[1:]
+    norm = dimensions[0] * np.sqrt(2 * np.pi) / dx ** 2 if D == 3 else dimensions[0] / dx
+    frequencies = [np.fft.fftfreq(dim, d=1 / dim) for dim in dimensions]
+    wavenorms = np.linalg.norm(np.stack(np.meshgrid(*frequencies, indexing="ij")), axis=0)
+    wavenumbers = np.arange(int(np.max(wavenorms)))
+    wavemask = (wavenorms[..., None] > wavenumbers - 0.5) & (wavenorms[..., None] <= wavenumbers + 0.5)
+    uh = np.stack([np.fft.fftn(flow.units.convert_velocity_to_pu(u[i])) for i in range(D)]) / norm
+    ekin = np.sum(0.5 * np.abs(uh) ** 2, axis=0)
+    return np.sum(ekin[..., None] * wavemask, axis=tuple(range(D)))
+
+
+@pytest.mark.parametrize("stencil, flow_class, resolution", [
+    (D2Q9, TaylorGreenVortex2D, 16),
+    (D2Q9, TaylorGreenVortex2D, 15),
+    (D3Q27, TaylorGreenVortex3D, 8),
+    (D3Q27, TaylorGreenVortex3D, 7),
+])
+def test_energy_spectrum_matches_wavemask_reference(stencil, flow_class, resolution):
+    lattice = Lattice(stencil, "cpu", dtype=paddle.float64)
+    flow = flow_class(resolution, 100, 0.05, lattice)
+    u = np.random.RandomState(0).normal(0.0, 0.01, (lattice.D,) + flow.grid[0].shape)
+    spectrum = EnergySpectrum(lattice, flow).spectrum_from_u(lattice.convert_to_tensor(u))
+    np.testing.assert_allclose(spectrum.numpy(), _wavemask_spectrum(flow, u), rtol=1e-12, atol=1e-18)
@@ -0,0 +1,41 @@
+"""
+Tests for the solvers of the periodic pressure Poisson equation.
+"""
+
+import numpy as np
+import paddle
+
+from lettuce import torch_jacobi, torch_conjugate_gradient, fft_poisson
+
+
+def _right_hand_side(shape, seed=0):
+    f = np.random.RandomState(seed).random_sample(shape)
+    return paddle.to_tensor(f - f.mean())
+
+
+def test_iterative_solvers_match_fft():
+    # odd sizes; on even periodic grids, the checkerboard mode does not converge in the Jacobi iteration
+    f = _right_hand_side((7, 9))
+    p = paddle.zeros_like(f)
+    expected = fft_poisson(f, p, dx=0.5).numpy()
+    jacobi = torch_jacobi(f, p, dx=0.5, device="cpu", dim=2, tol_abs=1e-22).numpy()
+    cg = torch_conjugate_gradient(f, p, dx=0.5, dim=2, tol_abs=1e-24, check_interval=5).numpy()
+    np.testing.assert_allclose(jacobi, expected, atol=1e-8)
+    np.testing.assert_allclose(cg, expected, atol=1e-10)
+
+
+def test_conjugate_gradient_with_zero_residuum():
+    f = paddle.zeros([6, 6, 6], dtype=paddle.float64)
+    p = paddle.full_like(f, 0.5)
+    np.testing.assert_array_equal(torch_conjugate_gradient(f, p, dx=1, dim=3).numpy(), p.numpy())
+
+
+def test_conjugate_gradient_keeps_the_converged_solution():
+    # CG converges within a few iterations on a single Fourier mode; iterating on must neither divide 0 by 0
+    # nor amplify rounding errors
+    x = 2 * np.pi * np.arange(8) / 8
+    f = paddle.to_tensor(np.sin(x)[:, None] * np.ones((8, 8)))
+    p = paddle.zeros_like(f)
+    result = torch_conjugate_gradient(f, p, dx=1, dim=2, max_num_steps=40, check_interval=1000).numpy()
+    assert np.isfinite(result).all()
+    np.testing.assert_allclose(result, fft_poisson(f, p, dx=1).numpy(), atol=1e-10)
@@ -0,0 +1,85 @@
+"""
+Tests for the simulation class.
+"""
+
+import numpy as np
+import paddle
+
+from lettuce import (
+    Lattice, D2Q9, TaylorGreenVortex2D, BGKCollision, StandardStreaming, Simulation, SpectralDerivative
+)
+
+# Python scalars enter a captured graph in single precision
+COMPILED_RTOL = 1e-6
+
+
+def _taylor_green_simulation(lattice):
+    flow = TaylorGreenVortex2D(resolution=16, reynolds_number=10, mach_number=0.05, lattice=lattice)
+    collision = BGKCollision(lattice, tau=flow.units.relaxation_parameter_lu)
+    return Simulation(flow=flow, lattice=lattice, collision=collision, streaming=StandardStreaming(lattice))
+
+
+def _eager_f(lattice, num_steps):
+    eager = _taylor_green_simulation(lattice)
+    eager.step(num_steps=num_steps)
+    return eager.f.numpy()
+
+
+def test_compiled_steps_match_eager_steps():
+    lattice = Lattice(D2Q9, "cpu", dtype=paddle.float64)
+    compiled = _taylor_green_simulation(lattice).compile()
+    compiled.step(num_steps=7)
+    assert compiled.i == 7
+    np.testing.assert_allclose(compiled.f.numpy(), _eager_f(lattice, 7), rtol=COMPILED_RTOL)
+
+
+def test_compiled_steps_per_call_with_remainder():
+    lattice = Lattice(D2Q9, "cpu", dtype=paddle.float64)
+    compiled = _taylor_green_simulation(lattice).compile(steps_per_call=3)
+    compiled.step(num_steps=7)
+    np.testing.assert_allclose(compiled.f.numpy(), _eager_f(lattice, 7), rtol=COMPILED_RTOL)
+
+
+def test_full_graph_compile():
+    # the AST transcriber raises where the steps can not be captured as one static graph
+    lattice = Lattice(D2Q9, "cpu", dtype=paddle.float64)
+    compiled = _taylor_green_simulation(lattice).compile(steps_per_call=3, full_graph=True)
+    compiled.step(num_steps=6)
+    np.testing.assert_allclose(compiled.f.numpy(), _eager_f(lattice, 6), rtol=COMPILED_RTOL)
+
+
+def test_initialize_f_neq_with_both_derivative_backends():
+    lattice = Lattice(D2Q9, "cpu", dtype=paddle.float64)
+    f = {}
+    for derivative in [None, SpectralDerivative()]:
+        simulation = _taylor_green_simulation(lattice)
+        feq = simulation.f.clone()
+        simulation.initialize_f_neq(derivative=derivative)
+        assert float((simulation.f - feq).abs().max()) > 0
+        np.testing.assert_allclose(lattice.rho(simulation.f).numpy(), lattice.rho(feq).numpy(), atol=1e-12)
+        np.testing.assert_allclose(lattice.j(simulation.f).numpy(), lattice.j(feq).numpy(), atol=1e-12)
+        f[derivative is None] = simulation.f.numpy()
+    np.testing.assert_allclose(f[True], f[False], atol=1e-6)
+
+
+def test_moment_cache_drops_moments_after_in_place_writes():
+    lattice = Lattice(D2Q9, "cpu", dtype=paddle.float64)
+    simulation = _taylor_green_simulation(lattice)
+    simulation.step(num_steps=1)
+    lattice.u(simulation.f)
+    simulation.f[0] = simulation.f[0] * 2
+    f = simulation.f.numpy()
+    rho = f.sum(axis=0)[None]
+    np.testing.assert_allclose(lattice.rho(simulation.f).numpy(), rho, rtol=1e-14)
+    np.testing.assert_allclose(lattice.u(simulation.f).numpy(), np.einsum("qd,q...->d...", D2Q9.e, f) / rho, rtol=1e-12)
+
+
+def test_simulations_on_a_shared_lattice_register_their_moment_caches():
+    lattice = Lattice(D2Q9, "cpu", dtype=paddle.float64)
+    first = _taylor_green_simulation(lattice)
+    second = _taylor_green_simulation(lattice)
+    for simulation in [first, second, first]:
+        simulation.step(num_steps=1)
+        assert lattice.moment_cache is simulation.moment_cache
+        for other in [first, second]:
+            np.testing.assert_allclose(lattice.rho(other.f).numpy(), other.f.numpy().sum(axis=0)[None], rtol=1e-14)
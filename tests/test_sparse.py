@@ -0,0 +1,34 @@
+"""
+Tests for the simulation on the fluid nodes only.
+"""
+
+import warnings
+
+import numpy as np
+import pytest
+
+from lettuce import (
+    BGKCollision, StandardStreaming, Simulation, SparseSimulation, BounceBackBoundary, HalfwayBounceBackBoundary
+)
+
+from conftest import _PorousTaylorGreen
+
+
+def test_sparse_simulation_matches_halfway_bounce_back(lattice):
+    flow = _PorousTaylorGreen(lattice, HalfwayBounceBackBoundary)
+    collision = BGKCollision(lattice, tau=flow.units.relaxation_parameter_lu)
+    reference = Simulation(flow, lattice, collision, StandardStreaming(lattice))
+    reference.step(num_steps=5)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        sparse = SparseSimulation(flow, lattice, collision)
+    sparse.step(num_steps=5)
+    fluid = ~flow.mask
+    np.testing.assert_allclose(sparse.dense().numpy()[:, fluid], reference.f.numpy()[:, fluid], rtol=1e-12)
+
+
+def test_sparse_simulation_warns_about_fullway_bounce_back(lattice):
+    flow = _PorousTaylorGreen(lattice, BounceBackBoundary)
+    collision = BGKCollision(lattice, tau=flow.units.relaxation_parameter_lu)
+    with pytest.warns(UserWarning, match="halfway"):
+        SparseSimulation(flow, lattice, collision)
@@ -0,0 +1,35 @@
+"""
+Tests for the streaming steps.
+"""
+
+import numpy as np
+import paddle
+import pytest
+
+from lettuce import Lattice, D2Q9, D3Q19, StandardStreaming, GatherStreaming
+
+from conftest import _random_f
+
+
+def _rolled(lattice, f, no_stream_mask=None):
+    """f_i(x) = f_i(x - e_i), with periodic wrap; masked populations stay."""
+    axes = tuple(range(lattice.D))
+    expected = np.stack([np.roll(f[i], shift=tuple(e), axis=axes) for i, e in enumerate(lattice.stencil.e)])
+    if no_stream_mask is not None:
+        expected = np.where(no_stream_mask, f, expected)
+    return expected
+
+
+@pytest.mark.parametrize("stencil, shape", [(D2Q9, (5, 6)), (D3Q19, (3, 4, 5))])
+@pytest.mark.parametrize("streaming_class", [StandardStreaming, GatherStreaming])
+@pytest.mark.parametrize("masked", [False, True])
+def test_streaming_matches_rolls(stencil, shape, streaming_class, masked):
+    lattice = Lattice(stencil, "cpu", dtype=paddle.float64)
+    f = _random_f(lattice, shape)
+    f_np = f.numpy()
+    streaming = streaming_class(lattice)
+    no_stream_mask = None
+    if masked:
+        no_stream_mask = np.random.RandomState(2).random_sample(f_np.shape) < 0.2
+        streaming.no_stream_mask = lattice.convert_to_tensor(no_stream_mask)
+    np.testing.assert_array_equal(streaming(f).numpy(), _rolled(lattice, f_np, no_stream_mask))
@@ -0,0 +1,41 @@
+"""
+Tests for the cache-blocked simulation.
+"""
+
+import numpy as np
+import paddle
+import pytest
+
+from lettuce import (
+    Lattice, D2Q9, LESCollision, WALEModel, StandardStreaming, Simulation, TiledSimulation, LettuceException
+)
+
+from conftest import _PorousTaylorGreen, _taylor_green, _bgk, _field_force_collision
+
+
+@pytest.mark.parametrize("tile_shape", [(None, 6), (5, None), (5, 6)])
+@pytest.mark.parametrize("make_flow, make_collision", [
+    (_taylor_green, _bgk),
+    (_PorousTaylorGreen, _bgk),
+    (_taylor_green, _field_force_collision),
+])
+def test_tiled_simulation_matches_simulation(tile_shape, make_flow, make_collision):
+    lattice = Lattice(D2Q9, "cpu", dtype=paddle.float64)
+    flow = make_flow(lattice)
+    reference = Simulation(flow, lattice, make_collision(lattice, flow), StandardStreaming(lattice))
+    reference.step(num_steps=6)
+    tiled = TiledSimulation(flow, lattice, make_collision(lattice, flow), StandardStreaming(lattice),
+                            tile_shape=tile_shape, num_threads=2)
+    try:
+        tiled.step(num_steps=6)
+    finally:
+        tiled.close()
+    np.testing.assert_allclose(tiled.f.numpy(), reference.f.numpy(), rtol=1e-12, atol=1e-14)
+
+
+def test_tiling_rejects_nonlocal_collision():
+    lattice = Lattice(D2Q9, "cpu", dtype=paddle.float64)
+    flow = _taylor_green(lattice)
+    collision = LESCollision(lattice, tau=flow.units.relaxation_parameter_lu, model=WALEModel())
+    with pytest.raises(LettuceException):
+        TiledSimulation(flow, lattice, collision, StandardStreaming(lattice), tile_shape=(5, 6))